@@ -0,0 +1,242 @@
+"""Throughput, latency and memory benchmarks for SlidingBook, Page and Packet.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_book --output results.json
+    python -m benchmarks.bench_book --compare base.json results.json
+"""
+import argparse
+import functools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.Book import SlidingBook
+from src.ColumnarPage import ColumnarPage
+from src.Packet import Packet, PacketBatch
+from src.Page import Page
+from .traffic import SCENARIOS, generate_traffic
+
+# Budget for `import src` in a fresh interpreter: short-lived workers should not pay for NumPy
+IMPORT_BUDGET_MS = 50
+IMPORT_BUDGET_RSS_KB = 10 * 1024
+# Resident set size is read from /proc: ru_maxrss would include the parent's peak, kept across exec
+IMPORT_PROBE = '''
+import sys, time
+def rss_kb():
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+before = rss_kb()
+start = time.perf_counter()
+import src
+elapsed = time.perf_counter() - start
+print(elapsed * 1e3, rss_kb() - before, 'numpy' in sys.modules)
+'''
+
+PAGE_FACTORIES = {
+    'object': lambda payload_size: Page,
+    'columnar': lambda payload_size: functools.partial(ColumnarPage, payload_size=payload_size),
+}
+
+
+def best_rate(run, count: int, repeat: int) -> float:
+    """Best items/sec over `repeat` runs of `run`, which processes `count` items."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def make_book(num_pages: int, page_size: int, page_factory) -> SlidingBook:
+    # A generous timeout keeps wall-clock jitter from changing which pages are evicted
+    return SlidingBook(num_pages=num_pages, page_size=page_size, timeout=60, page_factory=page_factory)
+
+
+def bench_book(packets: list, num_pages: int, page_size: int, page_factory, repeat: int) -> dict:
+    def loop():
+        book = make_book(num_pages, page_size, page_factory)
+        for packet in packets:
+            book.add_packet(packet)
+
+    def batch():
+        make_book(num_pages, page_size, page_factory).add_packets(packets)
+
+    # The same traffic given as separate fields, as a receiver decodes it: the loop has to
+    # build a Packet per datagram, the batch path takes the arrays as they are
+    SNs = [packet.SN for packet in packets]
+    messages = [packet.message for packet in packets]
+    macs = [packet.mac for packet in packets]
+    SN_array = np.array(SNs, dtype=np.int64)
+
+    def loop_fields():
+        book = make_book(num_pages, page_size, page_factory)
+        for SN, message, mac in zip(SNs, messages, macs):
+            book.add_packet(Packet(SN, message, mac))
+
+    def batch_fields():
+        make_book(num_pages, page_size, page_factory).add_packets(SN_array, messages, macs)
+
+    # Completion latency: time from a page's first packet to the call that returns it
+    book = make_book(num_pages, page_size, page_factory)
+    first_seen = {}
+    latencies = []
+    for packet in packets:
+        now = time.perf_counter()
+        first_seen.setdefault(packet.SN // page_size, now)
+        page = book.add_packet(packet)
+        if page is not None:
+            latencies.append(time.perf_counter() - first_seen[page.min_SN // page_size])
+    completed = len(latencies)
+
+    tracemalloc.start()
+    book = make_book(num_pages, page_size, page_factory)
+    for packet in packets:
+        book.add_packet(packet)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    percentiles = np.percentile(latencies, [50, 90, 99]) * 1e6 if latencies else [None] * 3
+    return {
+        'add_packet_pps': best_rate(loop, len(packets), repeat),
+        'add_packets_pps': best_rate(batch, len(packets), repeat),
+        'add_packet_fields_pps': best_rate(loop_fields, len(packets), repeat),
+        'add_packets_arrays_pps': best_rate(batch_fields, len(packets), repeat),
+        'pages_completed': completed,
+        'latency_us_p50': percentiles[0],
+        'latency_us_p90': percentiles[1],
+        'latency_us_p99': percentiles[2],
+        'peak_memory_bytes': peak,
+    }
+
+
+def bench_codec(packets: list, repeat: int) -> dict:
+    datagrams = [packet.to_bytes() for packet in packets]
+    buffer = b''.join(datagrams)
+    sizes = [len(datagram) for datagram in datagrams]
+    page = Page(page_size=len(packets))
+    for packet in packets[::2]:
+        page.add_packet(packet)
+
+    half = page.packets[1::2]
+    occupancy, present_bits = page.occupancy, page.present_bits
+
+    def fill():
+        page.packets[1::2] = half
+        page.occupancy, page.present_bits = occupancy, present_bits
+        page.fill_missing_packets()
+
+    return {
+        'to_bytes_pps': best_rate(lambda: [packet.to_bytes() for packet in packets], len(packets), repeat),
+        'to_bytes_shared_pps': best_rate(lambda: [packet.to_bytes(1.0) for packet in packets], len(packets), repeat),
+        'from_bytes_pps': best_rate(lambda: [Packet.from_bytes(datagram) for datagram in datagrams], len(packets), repeat),
+        'batch_decode_pps': best_rate(lambda: PacketBatch.from_buffer(buffer, sizes=sizes), len(packets), repeat),
+        'fill_missing_pps': best_rate(fill, len(packets) // 2, repeat),
+    }
+
+
+def bench_import(repeat: int) -> dict:
+    """Best time and RSS growth of `import src` in a fresh interpreter, against the budget."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], capture_output=True, text=True, check=True)
+        elapsed_ms, rss_kb, numpy_loaded = output.stdout.split()
+        runs.append((float(elapsed_ms), int(rss_kb), numpy_loaded == 'True'))
+    elapsed_ms, rss_kb, numpy_loaded = min(runs)
+    return {
+        'import_ms': elapsed_ms,
+        'import_rss_kb': rss_kb,
+        'import_loads_numpy': numpy_loaded,
+        'within_budget': elapsed_ms <= IMPORT_BUDGET_MS and rss_kb <= IMPORT_BUDGET_RSS_KB,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(count: int, grid_pages: list, grid_sizes: list, payload_sizes: list, repeat: int, seed: int) -> dict:
+    results = [dict(bench_import(max(repeat, 3)), benchmark='import')]
+    for payload_size in payload_sizes:
+        for scenario, options in SCENARIOS.items():
+            packets = generate_traffic(count, payload_size=payload_size, seed=seed, **options)
+            for num_pages in grid_pages:
+                for page_size in grid_sizes:
+                    for page_kind, factory in PAGE_FACTORIES.items():
+                        result = bench_book(packets, num_pages, page_size, factory(payload_size), repeat)
+                        result.update(benchmark='book', scenario=scenario, payload_size=payload_size,
+                                      num_pages=num_pages, page_size=page_size, page=page_kind)
+                        results.append(result)
+        packets = generate_traffic(count, payload_size=payload_size, mac_size=48, seed=seed)
+        result = bench_codec(packets, repeat)
+        result.update(benchmark='codec', payload_size=payload_size)
+        results.append(result)
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'config': dict(count=count, repeat=repeat, seed=seed),
+        'results': results,
+    }
+
+
+KEY_FIELDS = ('benchmark', 'scenario', 'payload_size', 'num_pages', 'page_size', 'page')
+
+
+def compare(base_path: str, new_path: str) -> None:
+    """Print the ratio new/base of every rate metric present in both result files."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    key = lambda result: tuple(result.get(field) for field in KEY_FIELDS)
+    base_results = {key(result): result for result in base['results']}
+    print(f"{base['revision']} -> {new['revision']}")
+    for result in new['results']:
+        previous = base_results.get(key(result))
+        if previous is None:
+            continue
+        label = ' '.join(f"{field}={result[field]}" for field in KEY_FIELDS if result.get(field) is not None)
+        for metric, value in result.items():
+            if metric.endswith('_pps') and previous.get(metric):
+                print(f"{label} {metric}: {value / previous[metric]:.2f}x")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_results.json', help="JSON file to write the results to")
+    parser.add_argument('--count', type=int, default=20000, help="packets per scenario")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per rate measurement, the best is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--num-pages', type=int, nargs='+', default=[4, 15, 64])
+    parser.add_argument('--page-size', type=int, nargs='+', default=[8, 18, 64])
+    parser.add_argument('--payload-size', type=int, nargs='+', default=[128, 1024],
+                        choices=Packet.ALLOWED_PAYLOAD_SIZES)
+    parser.add_argument('--quick', action='store_true', help="small single-point grid for smoke testing")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.quick:
+        args.count, args.repeat, args.num_pages, args.page_size, args.payload_size = 2000, 1, [15], [18], [128]
+
+    report = run(args.count, args.num_pages, args.page_size, args.payload_size, args.repeat, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
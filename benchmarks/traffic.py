@@ -0,0 +1,37 @@
+import random
+from src.Packet import Packet
+
+
+def generate_traffic(count: int, loss: float = 0.0, reorder_depth: int = 0, duplicate: float = 0.0,
+                     payload_size: int = 128, mac_size: int = 0, start_SN: int = 0, seed: int = 0) -> list:
+    """Build a reproducible packet arrival sequence.
+
+    `count` packets with consecutive SNs are sent; each is lost with probability `loss`,
+    duplicated with probability `duplicate` (the copy arrives up to `reorder_depth` + 1
+    positions later) and delayed by up to `reorder_depth` positions.
+    """
+    if payload_size not in Packet.ALLOWED_PAYLOAD_SIZES:
+        raise ValueError(f"Invalid payload size {payload_size}.")
+    rng = random.Random(seed)
+    message = bytes(rng.getrandbits(8) for _ in range(payload_size))
+    mac = bytes(mac_size)
+
+    arrivals = []
+    for position, SN in enumerate(range(start_SN, start_SN + count)):
+        if rng.random() < loss:
+            continue
+        packet = Packet(SN=SN, message=message, mac=mac, timestamp=float(position))
+        arrivals.append((position + rng.uniform(0, reorder_depth), packet))
+        if rng.random() < duplicate:
+            arrivals.append((position + rng.uniform(0, reorder_depth + 1), packet))
+    arrivals.sort(key=lambda arrival: arrival[0])
+    return [packet for _, packet in arrivals]
+
+
+SCENARIOS = {
+    'clean': dict(),
+    'lossy': dict(loss=0.05),
+    'reordered': dict(reorder_depth=32),
+    'duplicated': dict(duplicate=0.05),
+    'hostile': dict(loss=0.05, reorder_depth=64, duplicate=0.05),
+}
@@ -5,7 +5,8 @@ setup(
     version="0.1",
     packages=find_packages(where='src'),
     package_dir={"": "src"},
-    install_requires=['numpy'],
+    install_requires=[],
+    extras_require={'numpy': ['numpy']},  # PacketBatch, ColumnarPage, SpillStore, ParityCodec, captures; faster batches
     author="Your Name",
     author_email="mkashani.phd@gmail..com",
     description="A package for managing books, pages, and packets.",
@@ -0,0 +1,129 @@
+import math
+
+
+class AdaptiveTuner:
+    """Resize a SlidingBook's window and timeout from the reorder statistics it observes.
+
+    Every `interval` seconds of the book's clock, update() reads how many packets the book
+    accepted and dropped since the last update, the reorder distance histogram and the mean
+    inter-arrival time. The window is sized to cover the `quantile` reorder distance with
+    `headroom`, and the timeout to the time that many packets take to arrive.
+
+    With objective='memory' those sizes are used as they are, keeping the smallest window
+    that covers the observed reordering. With objective='drop_rate' the window and timeout
+    double while the drop rate is above `target_drop_rate`, and only shrink back toward the
+    computed sizes once it is below half the target. Both stay within the configured bounds.
+    Everything is derived from the book's counters and clock, so the tuner is deterministic
+    under an injected clock.
+    """
+    OBJECTIVES = ('drop_rate', 'memory')
+
+    def __init__(self, book, objective: str = 'drop_rate', target_drop_rate: float = 1e-3,
+                 min_pages: int = 2, max_pages: int = 4096, min_timeout: float = 1e-4, max_timeout: float = 1.0,
+                 interval: float = 0.1, quantile: float = 0.999, headroom: float = 2.0, min_samples: int = 256,
+                 alpha: float = 0.25):
+        if objective not in self.OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective!r}, expected one of {self.OBJECTIVES}.")
+        self.book = book
+        self.objective = objective
+        self.target_drop_rate = target_drop_rate
+        self.min_pages = min_pages
+        self.max_pages = max_pages
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.interval = interval  # Seconds of the book's clock between updates
+        self.quantile = quantile  # Fraction of packets whose reorder distance the window must cover
+        self.headroom = headroom
+        self.min_samples = min_samples  # Packets needed in an interval before acting on it
+        self.alpha = alpha  # Weight of the newest interval in the smoothed inter-arrival time
+
+        self.interarrival = None  # Smoothed seconds between packets
+        self.reorder_distance = 0  # Reorder distance at `quantile` in the last interval
+        self.drop_rate = 0.0  # Drop rate in the last interval
+        self._mark(book.clock())
+
+    def _mark(self, now: float) -> None:
+        metrics = self.book.metrics
+        self.last_update = now
+        self.last_accepted = self._delivered()
+        self.last_dropped = self._dropped()
+        self.last_reorder = list(metrics.reorder_distance)
+
+    def _delivered(self) -> int:
+        """Packets added to a page: accepted on arrival or drained from the stash."""
+        metrics = self.book.metrics
+        return metrics.accepted + metrics.stash_hits
+
+    def _dropped(self) -> int:
+        """Packets lost to the window: too late, or too early and not kept in the stash."""
+        metrics = self.book.metrics
+        return metrics.below_window + metrics.above_window
+
+    def update(self, now: float = None) -> bool:
+        """Retune the book if an interval has passed; return True if a parameter changed."""
+        book = self.book
+        if now is None:
+            now = book.clock()
+        elapsed = now - self.last_update
+        if elapsed < self.interval:
+            return False
+        metrics = book.metrics
+        accepted = self._delivered() - self.last_accepted
+        dropped = self._dropped() - self.last_dropped
+        if accepted + dropped < self.min_samples:
+            return False  # Too few packets to say anything; keep accumulating
+
+        reorder = [count - last for count, last in zip(metrics.reorder_distance, self.last_reorder)]
+        self._mark(now)
+        self.drop_rate = dropped / (accepted + dropped)
+        interarrival = elapsed / (accepted + dropped)
+        if self.interarrival is None:
+            self.interarrival = interarrival
+        else:
+            self.interarrival += self.alpha * (interarrival - self.interarrival)
+
+        # Upper bound of the histogram bucket holding the quantile: bucket b counts [2**(b-1), 2**b)
+        needed = self.quantile * sum(reorder)
+        seen = 0
+        for bucket, count in enumerate(reorder):
+            seen += count
+            if count and seen >= needed:
+                break
+        self.reorder_distance = (1 << bucket) - 1 if seen else 0
+
+        distance = self.headroom * self.reorder_distance
+        num_pages = math.ceil(distance / book.page_size) + 1
+        timeout = distance * self.interarrival
+        if self.objective == 'drop_rate':
+            if self.drop_rate > self.target_drop_rate:
+                num_pages = max(num_pages, 2 * book.num_pages)
+                timeout = max(timeout, 2 * book.timeout)
+            elif self.drop_rate > self.target_drop_rate / 2:
+                num_pages, timeout = book.num_pages, book.timeout  # Close to the target, hold
+            else:
+                # Shrink halfway toward the computed sizes so a lucky interval does not undo growth
+                num_pages = max(num_pages, (book.num_pages + num_pages) // 2)
+                timeout = max(timeout, (book.timeout + timeout) / 2)
+        return self.apply(num_pages, timeout)
+
+    def apply(self, num_pages: int, timeout: float) -> bool:
+        """Set the book's window and timeout, clamped to the bounds; return True if either changed."""
+        book = self.book
+        num_pages = min(max(num_pages, self.min_pages), self.max_pages)
+        timeout = min(max(timeout, self.min_timeout), self.max_timeout)
+        before = book.num_pages
+        if num_pages != before:
+            book.resize(num_pages)  # May stay larger while pages beyond the new size are buffered
+        changed = book.num_pages != before
+        if timeout != book.timeout:
+            book.set_timeout(timeout)
+            changed = True
+        return changed
+
+    def params(self) -> dict:
+        """The parameters chosen so far and the statistics they were derived from."""
+        return dict(num_pages=self.book.num_pages, timeout=self.book.timeout, reorder_distance=self.reorder_distance,
+                    interarrival=self.interarrival, drop_rate=self.drop_rate)
+
+    def __repr__(self):
+        return f"AdaptiveTuner(objective={self.objective!r}, num_pages={self.book.num_pages}, timeout={self.book.timeout})"
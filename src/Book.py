@@ -1,64 +1,808 @@
-import numpy as np
+import heapq
 import time
-from .Packet import Packet 
-from .Page import Page
+from collections import deque
+from .Packet import Packet, PacketBatch, optional_numpy
+from .Page import Page, missing_ranges
+from .Stats import BookStats
 
 
 class SlidingBook:
-    def __init__(self, num_pages:int = 15, page_size:int = 18, timeout:float = 0.001):
-        self.pages = {}
+    STASH_PACKET_OVERHEAD = 64  # Bytes charged to the stash per packet on top of its message and MAC
+
+    def __init__(self, num_pages:int = 15, page_size:int = 18, timeout:float = 0.001, page_factory=Page,
+                 clock=time.monotonic, on_event=None, packet_pool=None, stash_bytes:int = 0, budget=None,
+                 parity=None, stash_pages:int = None):
+        self.packet_pool = packet_pool  # Optional PacketPool that released pages give their packets back to
+        self.clock = clock  # Source of page update times; inject a fake clock to drive timeouts in tests
+        self.page_factory = page_factory  # Called with page_size to create a page, e.g. Page or ColumnarPage
         self.num_pages = num_pages
         self.page_size = page_size
         self.global_min_SN = 0
         self.global_max_SN = num_pages * page_size
         self.timeout = timeout
 
+        # Ring of num_pages slots: page index i lives in slot i % num_pages while it is in the window.
+        # A retired slot holds a page that was completed or evicted before the head reached it.
+        self.slots = [None] * num_pages
+        self.retired = [False] * num_pages
+        # Pages ready for reuse, preallocated so steady-state ingestion does not allocate
+        self.free_pages = [page_factory(page_size=page_size) for _ in range(num_pages)]
+        for page in self.free_pages:
+            page.released = True
+
+        # Min-heap of (deadline, page_index), pushed when a page is opened. Entries are refreshed
+        # lazily from page.last_update_time when they reach the top, so updates stay O(1)
+        self.deadlines = []
+        # Time since which later pages have been waiting on a head page that never arrived
+        self.gap_since = None
+
+        self.metrics = BookStats(hook=on_event)  # on_event(event, value) is called for every counted event
+        self.opened = [0.0] * num_pages  # Time each slot's page received its first packet
+
+        # Packets that arrived ahead of the window, by page index, kept up to stash_bytes of
+        # messages, MACs and per-packet overhead and drained into their pages when the window
+        # slides over them. Only packets at most stash_pages pages past the window are kept,
+        # so far-off SNs cannot hold the budget forever
+        self.stash_bytes = stash_bytes
+        self.stash_pages = num_pages if stash_pages is None else stash_pages
+        self.stash = {}
+        self.stash_size = 0
+        self._draining = False
+        # Pages completed while draining the stash, handed out by the next add/expire call
+        self.ready = deque()
+
+        # Optional MemoryBudget shared with other books; charged[slot] is what the slot's page was charged for
+        self.budget = budget
+        self.charged = [0] * num_pages
+        if budget is not None:
+            budget.register(self)
+
+        # Optional ParityCodec: pages missing at most k data packets are rebuilt and completed
+        # as soon as enough of their packets, repair packets included, have arrived
+        self.parity = parity
+
+    @property
+    def pages(self) -> dict:
+        """Pages currently buffered in the window, indexed by page number."""
+        head = self.get_min_page_index()
+        pages = {}
+        for offset in range(self.num_pages):
+            page = self.slots[(head + offset) % self.num_pages]
+            if page is not None:
+                pages[head + offset] = page
+        return pages
 
     def get_min_page_index(self) -> int:
         return self.global_min_SN // self.page_size
     
     def remove_page(self, page_index:int) -> Page:
-        if page_index in self.pages:
-            page = self.pages.pop(page_index)
-            
-            # If the page is the first page, update the global min and max SN
-            if page_index == self.get_min_page_index():
-                self.global_min_SN += self.page_size
-                self.global_max_SN += self.page_size
-            
-            return page  # Return the detached packets
+        head = self.get_min_page_index()
+        if page_index < head or page_index >= head + self.num_pages:
+            return None
+        slot = page_index % self.num_pages
+        page = self.slots[slot]
+        if page is None:
+            return None
+        self.slots[slot] = None
+        self.metrics.record_page(page, page.last_update_time - self.opened[slot])
+        if self.charged[slot]:
+            self.budget.credit(self, self.charged[slot], page_index)
+            self.charged[slot] = 0
+
+        if page_index == head:
+            self._slide()
+        else:
+            self.retired[slot] = True
+        return page  # Return the detached packets
+
+    def _slide(self) -> None:
+        """Slide the window past the head and every page already retired behind it."""
+        head = self.get_min_page_index()
+        slide = 1
+        while slide < self.num_pages and self.retired[(head + slide) % self.num_pages]:
+            self.retired[(head + slide) % self.num_pages] = False
+            slide += 1
+        self.global_min_SN += slide * self.page_size
+        self.global_max_SN += slide * self.page_size
+        self.gap_since = None
+        if self.stash:
+            self._drain_stash()
+
+    def _stash_packet(self, packet:Packet, record:bool = True) -> str:
+        """Keep an above-window packet for later if it fits in the stash; return the event counted.
+
+        A kept packet is counted as stashed, and its reorder distance is recorded now, on arrival,
+        like any accepted packet (add_packets passes record=False and records it in batch order). One that does not fit is dropped and counted as above_window
+        and as a stash overflow; one more than stash_pages pages past the window is dropped and
+        counted as above_window only.
+        """
+        metrics = self.metrics
+        if packet.SN >= self.global_max_SN + self.stash_pages * self.page_size:
+            metrics.above_window += 1  # Too far ahead to be drained any time soon
+            if self.packet_pool is not None:
+                self.packet_pool.release(packet)
+            return 'above_window'
+        size = len(packet.message) + len(packet.mac) + self.STASH_PACKET_OVERHEAD
+        if self.stash_size + size > self.stash_bytes:
+            metrics.above_window += 1
+            metrics.stash_overflows += 1
+            if metrics.hook is not None:
+                metrics.hook('stash_overflow', packet.SN)
+            if self.packet_pool is not None:
+                self.packet_pool.release(packet)
+            return 'above_window'
+        self.stash.setdefault(packet.SN // self.page_size, []).append(packet)
+        self.stash_size += size
+        metrics.stashed += 1
+        if record:
+            metrics.record_reorder(packet.SN)
+        return 'stashed'
+
+    def _drain_stash(self) -> None:
+        """Move the stashed packets of every page that is now in the window into its page."""
+        if self._draining:
+            return  # A page completed by the drain slid the window; the loop below picks that up
+        self._draining = True
+        try:
+            now = self.clock()
+            while True:
+                limit = self.get_min_page_index() + self.num_pages
+                due = sorted(page_index for page_index in self.stash if page_index < limit)
+                if not due:
+                    break
+                for page_index in due:
+                    packets = self.stash.pop(page_index)
+                    self.stash_size -= sum(len(packet.message) + len(packet.mac) + self.STASH_PACKET_OVERHEAD
+                                           for packet in packets)
+                    self._drain_page(page_index, packets, now)
+        finally:
+            self._draining = False
+
+    def _drain_page(self, page_index:int, packets:list, now:float) -> None:
+        metrics = self.metrics
+        hook = metrics.hook
+        page = None
+        if page_index >= self.get_min_page_index():
+            page = self._get_page(page_index, now)
+        for packet in packets:
+            try:
+                added = page is not None and page.add_packet(packet, now)
+            except ValueError:
+                added = False  # Does not fit the page; a stashed packet is resolved as a miss, not rejected
+            if not added:
+                metrics.stash_misses += 1
+                if hook is not None:
+                    hook('stash_miss', packet.SN)
+                if self.packet_pool is not None:
+                    self.packet_pool.release(packet)
+                continue
+            metrics.stash_hits += 1  # Already counted as stashed on arrival, so not as accepted again
+            if hook is not None:
+                hook('stash_hit', packet.SN)
+            if page.is_full() or (self.parity is not None and self._repair(page, now)):
+                self.ready.append(self.remove_page(page_index))
+                page = None  # Anything left for this page is a duplicate
+        if page is not None and page.min_SN is None:
+            self._close_unused(page_index, page)
+        elif page is not None and self.budget is not None:
+            self._charge(page_index, page)
+
+    def _reject(self, SN:int, page_index:int, page:Page) -> None:
+        """Count a packet its page raised ValueError on, e.g. a MAC too long for a ColumnarPage."""
+        self.metrics.rejected += 1
+        if self.metrics.hook is not None:
+            self.metrics.hook('rejected', SN)
+        self._close_unused(page_index, page)
+
+    def _close_unused(self, page_index:int, page:Page) -> None:
+        """Put back a page opened for packets that were all rejected, so no empty page sits in the window."""
+        if page.min_SN is not None:
+            return  # The page holds packets
+        self.slots[page_index % self.num_pages] = None
+        self._recycle(page)
+        if all(slot is None for slot in self.slots) and not any(self.retired):
+            self.gap_since = None  # Only this page was waiting on the head
+
+    def _charge(self, page_index:int, page:Page) -> None:
+        """Charge the budget for the bytes a page buffered since it was last charged."""
+        slot = page_index % self.num_pages
+        delta = page.buffered_bytes - self.charged[slot]
+        if delta:
+            self.charged[slot] += delta
+            self.budget.charge(self, delta, page_index, page)
+
+    def _repair(self, page:Page, now:float) -> bool:
+        """Rebuild a page's missing data packets from its repair packets; return True if it is now full."""
+        if page.occupancy < self.parity.data_slots:
+            return False
+        recovered = self.parity.recover(page, now)
+        if not page.is_full():
+            return False
+        self.metrics.parity_recovered += recovered
+        if recovered and self.metrics.hook is not None:
+            self.metrics.hook('parity_recovered', page)
+        return True
+
+    def _late(self, SN:int, event:str) -> str:
+        """Count a packet whose page already left under `event`, or as parity_late if it is a repair packet."""
+        if self.parity is not None and SN % self.page_size >= self.parity.data_slots:
+            event = 'parity_late'
+        setattr(self.metrics, event, getattr(self.metrics, event) + 1)
+        return event
+
+    def evict_page(self, page_index:int) -> Page:
+        """Remove a page to free memory and queue it in `ready` for the consumer, like a timed-out page."""
+        page = self.remove_page(page_index)
+        if page is not None:
+            self.metrics.budget_evictions += 1
+            if self.metrics.hook is not None:
+                self.metrics.hook('budget_evicted', page)
+            self.ready.append(page)
+        return page
+
+    def _take_ready(self, pages:list) -> None:
+        """Move the pages completed while draining the stash onto `pages`."""
+        pages.extend(self.ready)
+        self.ready.clear()
+
+    def drain_ready(self) -> list:
+        """Return every page waiting in `ready`: completed from the stash or evicted by a MemoryBudget.
+
+        add_packet hands out at most one page per call, so callers that use it with a stash or
+        a budget should call this after each packet (or poll expire()) to collect the others.
+        """
+        pages = list(self.ready)
+        self.ready.clear()
+        return pages
+
+    def release_page(self, page:Page) -> None:
+        """Hand a page returned by the book back for reuse once the consumer is done with it.
+
+        Raises ValueError if the page was already released, or is still buffered or waiting in
+        `ready`, since reusing it would overwrite packets the book or a consumer still holds.
+        """
+        if page.released:
+            raise ValueError("Page was already released.")
+        if page.min_SN is not None:
+            page_index = page.min_SN // self.page_size
+            if self.slots[page_index % self.num_pages] is page:
+                raise ValueError(f"Page {page_index} is still buffered in the book.")
+        if any(ready is page for ready in self.ready):
+            raise ValueError("Page is waiting in ready and was not handed out yet.")
+        self._recycle(page)
+
+    def _recycle(self, page:Page) -> None:
+        """Clear a page and put it on the free list, or give it back to the page factory.
+
+        A factory with an `owns` method (SpillStore) only gets its own pages reused, so a
+        fallback page it handed out is given back rather than buffering window pages.
+        """
+        page.released = True
+        if self.packet_pool is not None:
+            page.release_packets(self.packet_pool)
+        else:
+            page.clear()
+        owns = getattr(self.page_factory, 'owns', None)
+        if len(self.free_pages) < self.num_pages and (owns is None or owns(page)):
+            self.free_pages.append(page)
+        elif hasattr(self.page_factory, 'release'):
+            self.page_factory.release(page)  # Give the page's storage back, e.g. a SpillStore slot
+
+    def _new_page(self) -> Page:
+        """Take a page from the free list, or a new one from the page factory."""
+        page = self.free_pages.pop() if self.free_pages else self.page_factory(page_size=self.page_size)
+        page.released = False
+        return page
+
+    def _get_page(self, page_index:int, now:float) -> Page:
+        """Return the page for an in-window index, taking a free page if needed, or None if it was retired."""
+        slot = page_index % self.num_pages
+        page = self.slots[slot]
+        if page is None:
+            if self.retired[slot]:
+                return None
+            page = self._new_page()
+            if len(self.deadlines) >= 2 * self.num_pages:
+                # Drop entries of pages that completed before their deadline came up
+                self.deadlines = [(p.last_update_time + self.timeout, i) for i, p in self.pages.items()]
+                heapq.heapify(self.deadlines)
+            page.last_update_time = now
+            self.opened[slot] = now
+            self.slots[slot] = page
+            heapq.heappush(self.deadlines, (now + self.timeout, page_index))
+            head = self.get_min_page_index()
+            if page_index == head:
+                self.gap_since = None
+            elif self.gap_since is None and self.slots[head % self.num_pages] is None:
+                self.gap_since = now
+        return page
+
+    def _skip_expired_gap(self, now:float) -> None:
+        """Slide past head pages that never arrived once later pages have waited longer than the timeout."""
+        while self.gap_since is not None and self.gap_since + self.timeout < now:
+            if self.slots[self.get_min_page_index() % self.num_pages] is not None:
+                self.gap_since = None
+                return
+            gap_since = self.gap_since
+            self._slide()
+            if any(page is not None for page in self.slots) or any(self.retired):
+                self.gap_since = gap_since  # Later pages are still waiting behind the new head
+
+    def _remove_stale_head(self, now:float) -> Page:
+        """Remove and return the first page if it has not been updated within the timeout."""
+        self._skip_expired_gap(now)
+        min_page_index = self.get_min_page_index()
+        page = self.slots[min_page_index % self.num_pages]
+        if page and page.last_update_time + self.timeout < now: 
+            return self.remove_page(min_page_index)
         return None
 
+    def expire(self, now:float = None) -> list:
+        """Remove and return every page that has not been updated within the timeout.
+
+        Only pages whose deadline has passed are touched, so the cost is proportional to the
+        number of expired pages rather than to the window size. `now` defaults to the book's clock.
+        """
+        if now is None:
+            now = self.clock()
+        expired = []
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] < now:
+            _, page_index = heapq.heappop(deadlines)
+            head = self.get_min_page_index()
+            if page_index < head or page_index >= head + self.num_pages:
+                continue  # The page already left the window
+            page = self.slots[page_index % self.num_pages]
+            if page is None:
+                continue  # The page was already completed or evicted
+            deadline = page.last_update_time + self.timeout
+            if deadline < now:
+                expired.append(self.remove_page(page_index))
+                if self.ready:
+                    self._take_ready(expired)
+            else:
+                heapq.heappush(deadlines, (deadline, page_index))
+        self._skip_expired_gap(now)
+        if self.ready:
+            self._take_ready(expired)
+        return expired
+
     def add_packet(self, packet:Packet) -> Page:
         SN = packet.SN
         page_index = SN // self.page_size
 
+        now = self.clock()
+        metrics = self.metrics
         if SN < self.global_min_SN or SN >= self.global_max_SN:
-            min_page_index = self.get_min_page_index()
-            page = self.pages.get(min_page_index)
-            if page and page.last_update_time + self.timeout < time.time(): 
-                return self.remove_page(min_page_index)
-            return None
+            if SN < self.global_min_SN:
+                event = self._late(SN, 'below_window')
+            elif self.stash_bytes:
+                event = self._stash_packet(packet)
+            else:
+                metrics.above_window += 1
+                event = 'above_window'
+            if metrics.hook is not None:
+                metrics.hook(event, SN)
+            page = self._remove_stale_head(now)
+            if page is None and self.ready:
+                return self.ready.popleft()
+            return page
 
-        page = self.pages.get(page_index)
-        
+        page = self.slots[page_index % self.num_pages]  # The SN is in the window, so this is its page if open
         if page is None:
-            page = Page(page_size=self.page_size)
-            self.pages[page_index] = page
-
-        if page.add_packet(packet):
-            if page.is_full():
+            page = self._get_page(page_index, now)
+        hook = metrics.hook
+        try:
+            added = page is not None and page.add_packet(packet, now)
+        except ValueError:
+            self._reject(SN, page_index, page)
+            return self.ready.popleft() if self.ready else None
+        if added:
+            metrics.accepted += 1
+            if SN > metrics.max_SN:
+                metrics.max_SN = SN  # metrics.record_reorder inlined for the in-order case
+                metrics.reorder_distance[0] += 1
+            else:
+                metrics.record_reorder(SN)
+            if hook is not None:
+                hook('accepted', SN)
+            if page.occupancy == self.page_size or (self.parity is not None and self._repair(page, now)):
                 return self.remove_page(page_index)
-        return None
+            if self.budget is not None:
+                self._charge(page_index, page)
+            return self.ready.popleft() if self.ready else None
+
+        # Either the slot holds this SN already or the page was already completed or evicted
+        if page is None:
+            event = self._late(SN, 'duplicate')
+        else:
+            metrics.duplicate += 1
+            event = 'duplicate'
+        if hook is not None:
+            hook(event, SN)
+        return self.ready.popleft() if self.ready else None
+
+    def add_packets(self, packets, payloads=None, macs=None, timestamps=None) -> list:
+        """Add a batch of packets and return every page completed or evicted during the batch.
+
+        `packets` is either an iterable of Packet instances, a decoded PacketBatch, or, when
+        `payloads` is given, a sequence/NumPy array of SNs whose messages (and optional MACs
+        and timestamps) are passed alongside. The outcome is the same as calling add_packet
+        in a loop, but a single timestamp is taken for the whole batch. Without NumPy the
+        packets are added one by one.
+        """
+        if isinstance(packets, PacketBatch):
+            if self.page_factory is Page:
+                # Page keeps bytes in its Packets anyway: copy them out without building views
+                return self.add_packets(packets.SNs, *packets.copy_fields(), packets.timestamps.tolist())
+            return self.add_packets(packets.SNs, packets.messages, packets.macs, packets.timestamps.tolist())
+
+        np = optional_numpy()  # Looked up on the first batch, so single-packet users never load NumPy
+        if np is None:
+            return self._add_packets_one_by_one(packets, payloads, macs, timestamps)
+        now = self.clock()
+        if payloads is None:
+            packets = packets if isinstance(packets, (list, tuple)) else list(packets)
+            SN_list = [packet.SN for packet in packets]
+        else:
+            SN_list = packets.tolist() if isinstance(packets, np.ndarray) else [int(SN) for SN in packets]
+            if len(payloads) != len(SN_list):
+                raise ValueError(f"Got {len(SN_list)} SNs but {len(payloads)} payloads.")
+            if macs is None:
+                macs = (b'',) * len(SN_list)
+            if timestamps is None:
+                timestamps = (0,) * len(SN_list)
+        pool = self.packet_pool
+
+        completed = []
+        count = len(SN_list)
+        if count == 0:
+            return completed
+
+        # Split the batch into runs of consecutive packets that land on the same page,
+        # so the window check and page lookup happen once per run instead of once per packet.
+        # Only the split is vectorized; the per-packet loop below works on plain Python lists
+        page_size = self.page_size
+        page_indices = np.array(SN_list, dtype=np.int64) // page_size
+        bounds = np.flatnonzero(np.diff(page_indices)) + 1
+        starts = [0] + bounds.tolist()
+        stops = bounds.tolist() + [count]
+
+        metrics = self.metrics
+        hook = metrics.hook
+        accepted = 0
+        arrived = []  # SNs accepted or stashed, in arrival order, for the reorder histogram
+        for start, stop in zip(starts, stops):
+            page_index = SN_list[start] // page_size
+            i = start
+            while i < stop:
+                SN = SN_list[i]
+                if SN < self.global_min_SN or SN >= self.global_max_SN:
+                    if SN < self.global_min_SN:
+                        event = self._late(SN, 'below_window')
+                    elif self.stash_bytes:
+                        if payloads is None:
+                            packet = packets[i]
+                        else:
+                            # Copy the fields out, since payloads may be views into a receive buffer
+                            fields = (SN, bytes(payloads[i]), bytes(macs[i]), timestamps[i])
+                            packet = pool.acquire(*fields) if pool is not None else Packet(*fields)
+                        event = self._stash_packet(packet, record=False)
+                        if event == 'stashed':
+                            arrived.append(SN)
+                    else:
+                        metrics.above_window += 1
+                        event = 'above_window'
+                    if hook is not None:
+                        hook(event, SN)
+                    page = self._remove_stale_head(now)
+                    if page is not None:
+                        completed.append(page)
+                    if self.ready:
+                        self._take_ready(completed)
+                    i += 1
+                    continue
+
+                page = self._get_page(page_index, now)
+                if page is None:
+                    # The page was already completed or evicted
+                    if self.parity is not None:
+                        for SN in SN_list[i:stop]:
+                            event = self._late(SN, 'duplicate')
+                            if hook is not None:
+                                hook(event, SN)
+                    else:
+                        metrics.duplicate += stop - i
+                        if hook is not None:
+                            for SN in SN_list[i:stop]:
+                                hook('duplicate', SN)
+                    i = stop
+                    break
+
+                # The window only moves when a page completes, so the rest of the run
+                # stays in the window until then
+                build = pool is None and type(page) is Page
+                while i < stop:
+                    SN = SN_list[i]
+                    try:
+                        if payloads is None:
+                            added = page.add_packet(packets[i], now)
+                        elif build:
+                            # Page keeps Packet objects: build one straight from the fields, copying views
+                            message, mac = payloads[i], macs[i]
+                            added = page.add_packet(Packet(SN, message if type(message) is bytes else bytes(message),
+                                                           mac if type(mac) is bytes else bytes(mac), timestamps[i]), now)
+                        else:
+                            added = page.add_record(SN, payloads[i], macs[i], timestamps[i], now, pool)
+                    except ValueError:
+                        self._reject(SN, page_index, page)
+                        i += 1
+                        if self.slots[page_index % self.num_pages] is not page:
+                            break  # The page was closed again; the rest of the run reopens it
+                        continue
+                    if added:
+                        accepted += 1
+                        arrived.append(SN)
+                    else:
+                        metrics.duplicate += 1
+                    if hook is not None:
+                        hook('accepted' if added else 'duplicate', SN)
+                    i += 1
+                    if added and (page.occupancy == page_size or (self.parity is not None and self._repair(page, now))):
+                        completed.append(self.remove_page(page_index))
+                        if self.ready:
+                            self._take_ready(completed)
+                        break
+                if self.budget is not None and self.slots[page_index % self.num_pages] is page:
+                    self._charge(page_index, page)
+
+        metrics.accepted += accepted
+        metrics.record_reorders(np.array(arrived, dtype=np.int64))
+        if self.ready:
+            self._take_ready(completed)
+        return completed
     
-    def get_page_index(self) -> np.ndarray:
-        return np.array(list(self.pages.keys()))
+    def _add_packets_one_by_one(self, packets, payloads, macs, timestamps) -> list:
+        """add_packets without NumPy: feed add_packet and collect every page it hands out."""
+        if payloads is not None:
+            if len(payloads) != len(packets):
+                raise ValueError(f"Got {len(packets)} SNs but {len(payloads)} payloads.")
+            packets = self._build_packets(packets, payloads, macs, timestamps)
+        completed = []
+        for packet in packets:
+            page = self.add_packet(packet)
+            if page is not None:
+                completed.append(page)
+        self._take_ready(completed)
+        return completed
+
+    def _build_packets(self, SNs, payloads, macs, timestamps):
+        """Yield a Packet per SN from separate fields, counting the ones that cannot be built as rejected."""
+        for i, SN in enumerate(SNs):
+            try:
+                yield Packet(SN=int(SN), message=bytes(payloads[i]), mac=bytes(macs[i]) if macs is not None else b'',
+                             timestamp=timestamps[i] if timestamps is not None else 0)
+            except ValueError:
+                self.metrics.rejected += 1
+                if self.metrics.hook is not None:
+                    self.metrics.hook('rejected', int(SN))
+
+    def resize(self, num_pages:int) -> int:
+        """Change the number of pages in the window and return the new size.
+
+        The window keeps its head. It does not shrink below the furthest page still buffered
+        or already completed ahead of the head, so nothing is dropped; call again later to
+        shrink further. Growing the window drains stashed packets that now fit.
+        """
+        head = self.get_min_page_index()
+        furthest = 0
+        for offset in range(self.num_pages):
+            slot = (head + offset) % self.num_pages
+            if self.slots[slot] is not None or self.retired[slot]:
+                furthest = offset + 1
+        num_pages = max(num_pages, furthest, 1)
+        if num_pages == self.num_pages:
+            return num_pages
+
+        slots = [None] * num_pages
+        retired = [False] * num_pages
+        opened = [0.0] * num_pages
+        charged = [0] * num_pages
+        for page_index in range(head, head + furthest):
+            old, new = page_index % self.num_pages, page_index % num_pages
+            slots[new], retired[new], opened[new] = self.slots[old], self.retired[old], self.opened[old]
+            charged[new] = self.charged[old]
+        self.slots, self.retired, self.opened, self.charged = slots, retired, opened, charged
+        self.num_pages = num_pages
+        self.global_max_SN = self.global_min_SN + num_pages * self.page_size
+        while len(self.free_pages) > num_pages:
+            page = self.free_pages.pop()
+            if hasattr(self.page_factory, 'release'):
+                self.page_factory.release(page)
+        if self.stash:
+            self._drain_stash()
+        return num_pages
+
+    def set_timeout(self, timeout:float) -> None:
+        """Change the eviction timeout; pending deadlines are recomputed from it."""
+        self.timeout = timeout
+        self.deadlines = [(page.last_update_time + timeout, page_index) for page_index, page in self.pages.items()]
+        heapq.heapify(self.deadlines)
+
+    def restore(self, pages, global_min_SN:int = 0) -> list:
+        """Put pages recovered from persistent storage (see SpillStore) back into an empty book.
+
+        The window starts at `global_min_SN`, moved forward if needed so the highest page fits.
+        Partial pages in the window are buffered again with fresh deadlines. Full pages and pages
+        below the window are returned in page order, since the consumer had not released them
+        before the restart and they must be delivered again.
+        """
+        now = self.clock()
+        pages = sorted((page for page in pages if page.min_SN is not None), key=lambda page: page.min_SN)
+        head = global_min_SN // self.page_size
+        if pages:
+            head = max(head, pages[-1].min_SN // self.page_size - self.num_pages + 1)
+        self.global_min_SN = head * self.page_size
+        self.global_max_SN = self.global_min_SN + self.num_pages * self.page_size
+
+        redeliver = []
+        for page in pages:
+            page_index = page.min_SN // self.page_size
+            slot = page_index % self.num_pages
+            if page_index < head or page.is_full():
+                redeliver.append(page)
+                if page_index >= head:
+                    self.retired[slot] = True
+                continue
+            page.last_update_time = now
+            self.opened[slot] = now
+            self.slots[slot] = page
+            heapq.heappush(self.deadlines, (now + self.timeout, page_index))
+            if self.budget is not None:
+                self._charge(page_index, page)
+
+        # Move the head past pages that are being delivered again
+        for _ in range(self.num_pages):
+            slot = self.get_min_page_index() % self.num_pages
+            if not self.retired[slot]:
+                break
+            self.retired[slot] = False
+            self.global_min_SN += self.page_size
+            self.global_max_SN += self.page_size
+        buffered = any(page is not None for page in self.slots)
+        if buffered and self.slots[self.get_min_page_index() % self.num_pages] is None:
+            self.gap_since = now
+        return redeliver
+
+    def stream(self, source, expire_every:int = 64, flush:bool = True):
+        """Add packets from `source` and yield the pages they complete or evict, strictly in page order.
+
+        `source` is any iterable of Packets, PacketBatches or raw datagrams (decoded with
+        Packet.from_bytes). Pages completed ahead of the head are held back until every page
+        before them was yielded, so at most one window of pages is held. A page that never
+        received a packet before the window moved past it is yielded as an empty page.
+        The book is expired every `expire_every` items so a stale head does not stall the
+        stream, and with `flush` the pages still buffered are evicted once the source ends.
+        """
+        pending = {}  # Pages that left the window, by page index, waiting for their turn
+        next_index = self.get_min_page_index()
+
+        def deliver(pages):
+            nonlocal next_index
+            for page in pages:
+                if page is not None:
+                    pending[page.min_SN // self.page_size] = page
+            while self.ready:
+                page = self.ready.popleft()
+                pending[page.min_SN // self.page_size] = page
+            # Every page below the head has left the window; hand them out in order
+            head = self.get_min_page_index()
+            while next_index < head:
+                page = pending.pop(next_index, None)
+                yield page if page is not None else self._gap_page(next_index)
+                next_index += 1
+
+        for count, item in enumerate(source, 1):
+            if isinstance(item, Packet):
+                pages = (self.add_packet(item),)
+            elif isinstance(item, PacketBatch):
+                pages = self.add_packets(item)
+            else:
+                pages = (self.add_packet(Packet.from_bytes(item)),)
+            yield from deliver(pages)
+            if count % expire_every == 0:
+                yield from deliver(self.expire())
+
+        if flush:
+            yield from deliver(self.flush())
+
+    def flush(self) -> list:
+        """Evict every page left in the book and return them, with the `ready` ones, in page order.
+
+        The window slides over pages that never arrived, so stashed packets are drained into
+        their pages and handed out too instead of being dropped.
+        """
+        pages = self.drain_ready()
+        while any(page is not None for page in self.slots) or any(self.retired) or self.stash:
+            head = self.get_min_page_index()
+            if self.slots[head % self.num_pages] is not None:
+                pages.append(self.remove_page(head))
+            else:
+                self._slide()
+            self._take_ready(pages)
+        pages.sort(key=lambda page: page.min_SN)
+        return pages
+
+    def _gap_page(self, page_index:int) -> Page:
+        """Empty page standing for a page index the window moved past without receiving any packet."""
+        page = self._new_page()
+        page.min_SN = page_index * self.page_size
+        page.max_SN = page.min_SN + self.page_size
+        return page
+
+    def bitmap(self) -> int:
+        """Presence bitmap of the window: bit i is set once SN global_min_SN + i was received.
+
+        Slots of pages that already left the window are reported as present.
+        """
+        head = self.get_min_page_index()
+        retired_bits = (1 << self.page_size) - 1
+        bitmap = 0
+        for offset in range(self.num_pages):
+            slot = (head + offset) % self.num_pages
+            page = self.slots[slot]
+            if page is not None:
+                bitmap |= page.bitmap() << (offset * self.page_size)
+            elif self.retired[slot]:
+                bitmap |= retired_bits << (offset * self.page_size)
+        return bitmap
+
+    def missing_ranges(self, stop_SN:int = None) -> list:
+        """Half-open SN ranges [start, stop) missing from the window, for a NACK report.
+
+        Only SNs below `stop_SN` are reported; it defaults to just past the highest SN accepted,
+        since later packets are not known to be lost yet.
+        """
+        if stop_SN is None:
+            stop_SN = self.metrics.max_SN + 1
+        count = min(stop_SN, self.global_max_SN) - self.global_min_SN
+        if count <= 0:
+            return []
+        return missing_ranges(self.bitmap(), count, self.global_min_SN)
+
+    def stats(self) -> dict:
+        """Snapshot of the book's counters and histograms together with its current window."""
+        snapshot = self.metrics.snapshot()
+        snapshot.update(global_min_SN=self.global_min_SN, global_max_SN=self.global_max_SN,
+                        buffered_pages=sum(1 for page in self.slots if page is not None),
+                        stash_size=self.stash_size, buffered_bytes=sum(self.charged))
+        return snapshot
+
+    def get_page_index(self):
+        """Indices of the buffered pages, as a NumPy array when NumPy is installed."""
+        np = optional_numpy()
+        indices = list(self.pages.keys())
+        return indices if np is None else np.array(indices)
 
     def clear_all(self) -> None:
-        self.pages = {}
+        for page in self.pages.values():
+            self._recycle(page)
+        if self.budget is not None:
+            # Re-registering drops the book's bytes and candidate pages in one step
+            self.budget.unregister(self)
+            self.budget.register(self)
+        self.charged = [0] * self.num_pages
+        self.slots = [None] * self.num_pages
+        self.retired = [False] * self.num_pages
+        self.deadlines = []
+        self.gap_since = None
+        self.stash = {}
+        self.stash_size = 0
+        self.ready.clear()
         self.global_min_SN = 0
         self.global_max_SN = self.num_pages * self.page_size
+        self.metrics.max_SN = -1  # missing_ranges() stops at it by default
     
     def __repr__(self):
         return f"SlidingBook(num_pages={self.num_pages}, page_size={self.page_size}, pages={self.pages}, global_min_SN={self.global_min_SN}, global_max_SN={self.global_max_SN})"
- 
\ No newline at end of file
+ 
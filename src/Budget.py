@@ -0,0 +1,142 @@
+import heapq
+from collections import OrderedDict
+
+
+class MemoryBudget:
+    """Shared limit on the message and MAC bytes buffered by a set of SlidingBooks.
+
+    Pass the same budget to every book (e.g. through BookRegistry's book_kwargs). Books charge
+    the bytes of the packets they accept and are credited when a page leaves them. Once the
+    total goes over `max_bytes`, pages are evicted until it is back under `low_water` times
+    the limit, choosing by `policy`:
+
+    - 'oldest': the page with the oldest last_update_time across all books.
+    - 'least_complete': the page with the fewest packets relative to its size, oldest first.
+    - 'fair_share': the oldest page of the book buffering the most bytes, so flows above an
+      equal share of the budget give memory back first.
+
+    Candidates are indexed as books charge them, so picking a victim does not scan the books:
+    an LRU order of pages for 'oldest', and lazily invalidated heaps of pages or books for the
+    other policies.
+
+    An evicted page goes to its book's `ready` queue. The book hands it out from its next
+    add_packets or expire call, or from drain_ready(); a flow that receives nothing more gets
+    it on the next expire pass (BookRegistry.expire covers every book).
+    """
+    POLICIES = ('oldest', 'least_complete', 'fair_share')
+
+    def __init__(self, max_bytes: int, policy: str = 'oldest', low_water: float = 0.9):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {self.POLICIES}.")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.low_water = low_water  # Evicting a little below the limit amortizes the victim search
+        self.used = 0
+        self.books = {}  # Bytes buffered per registered book
+        self.evictions = 0
+
+        self.book_pages = {}  # Per book, its charged page indices, least recently charged first
+        self.lru = OrderedDict()  # (book, page_index) keys, least recently charged first ('oldest')
+        # Heap of (sort key..., version, key) for 'least_complete' (keys are pages) and
+        # 'fair_share' (keys are books); an entry is stale once its key has a newer version
+        self.heap = []
+        self.versions = {}
+        self._version = 0
+
+    def register(self, book) -> None:
+        self.books.setdefault(book, 0)
+        self.book_pages.setdefault(book, OrderedDict())
+
+    def unregister(self, book) -> None:
+        """Forget a book that is no longer used, returning the bytes it was charged for."""
+        self.used -= self.books.pop(book, 0)
+        for page_index in self.book_pages.pop(book, ()):
+            self.lru.pop((book, page_index), None)
+            self.versions.pop((book, page_index), None)
+        self.versions.pop(book, None)
+
+    def charge(self, book, nbytes: int, page_index: int = None, page=None) -> None:
+        """Account for bytes a book buffered in a page and evict pages if the budget is exceeded."""
+        self.books[book] += nbytes
+        self.used += nbytes
+        if page_index is not None:
+            pages = self.book_pages[book]
+            pages[page_index] = None
+            pages.move_to_end(page_index)
+            if self.policy == 'oldest':
+                key = (book, page_index)
+                self.lru[key] = None
+                self.lru.move_to_end(key)
+            elif self.policy == 'least_complete':
+                self._push((book, page_index), (page.occupancy / page.page_size, page.last_update_time))
+        if self.policy == 'fair_share':
+            self._push(book, (-self.books[book],))
+        if self.used > self.max_bytes:
+            self.evict(int(self.max_bytes * self.low_water))
+
+    def credit(self, book, nbytes: int, page_index: int = None) -> None:
+        """Account for bytes that left a book, with the page they were buffered in."""
+        self.books[book] -= nbytes
+        self.used -= nbytes
+        if page_index is not None:
+            self._forget(book, page_index)
+        if self.policy == 'fair_share':
+            if self.books[book] > 0:
+                self._push(book, (-self.books[book],))
+            else:
+                self.versions.pop(book, None)
+
+    def _forget(self, book, page_index: int) -> None:
+        self.book_pages[book].pop(page_index, None)
+        self.lru.pop((book, page_index), None)
+        self.versions.pop((book, page_index), None)
+
+    def _push(self, key, sort_key: tuple) -> None:
+        self._version += 1
+        self.versions[key] = self._version
+        heapq.heappush(self.heap, sort_key + (self._version, key))
+        if len(self.heap) > 2 * len(self.versions) + 64:
+            # Drop stale entries so the heap stays proportional to the live candidates
+            self.heap = [entry for entry in self.heap if self.versions.get(entry[-1]) == entry[-2]]
+            heapq.heapify(self.heap)
+
+    def evict(self, target: int) -> int:
+        """Evict pages until at most `target` bytes are buffered; return the number of pages evicted."""
+        evicted = 0
+        while self.used > target:
+            victim = self._victim()
+            if victim is None:
+                break  # Only bytes outside any page (nothing left to evict)
+            book, page_index = victim
+            if book.evict_page(page_index) is None:
+                self._forget(book, page_index)  # The page already left without being credited
+                continue
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def _victim(self):
+        """Return the (book, page_index) to evict next under the policy, or None."""
+        if self.policy == 'oldest':
+            return next(iter(self.lru), None)
+
+        heap = self.heap
+        while heap:
+            version, key = heap[0][-2:]
+            if self.versions.get(key) != version:
+                heapq.heappop(heap)  # Stale: superseded by a newer entry, or gone
+                continue
+            if self.policy == 'least_complete':
+                return key
+            pages = self.book_pages[key]
+            if pages:
+                return key, next(iter(pages))
+            heapq.heappop(heap)  # A book with bytes but no charged pages has nothing to evict
+            self.versions.pop(key, None)
+        return None
+
+    def __len__(self):
+        return len(self.books)
+
+    def __repr__(self):
+        return f"MemoryBudget(used={self.used}, max_bytes={self.max_bytes}, policy={self.policy!r}, books={len(self.books)})"
@@ -0,0 +1,184 @@
+import mmap
+import os
+import struct
+import time
+from .Packet import HEADER, Packet, PacketBatch, require_numpy
+
+np = require_numpy('CaptureReader and CaptureWriter')
+
+MAGIC = b'BOOKCAP1'
+FRAME = struct.Struct('!I')  # Length of the datagram that follows
+INDEX = struct.Struct('<qdQQ')  # SN, arrival time, datagram offset, datagram size
+INDEX_DTYPE = np.dtype([('SN', '<i8'), ('time', '<f8'), ('offset', '<u8'), ('size', '<u8')])
+
+
+class CaptureWriter:
+    """Append packets to a capture file, with a sidecar index at `path + '.idx'`.
+
+    Each record is a 4-byte length followed by the packet in wire format, carrying the packet's
+    own timestamp. The index holds one fixed-size (SN, arrival time, offset, size) entry per
+    record, so readers can search a capture without scanning it.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock  # Arrival time of packets written without one
+        self.data = open(path, 'ab')
+        self.index = open(path + '.idx', 'ab')
+        self.offset = self.data.tell()
+        if self.offset == 0:
+            self.data.write(MAGIC)
+            self.offset = len(MAGIC)
+
+    def write(self, packet: Packet, arrival_time: float = None) -> None:
+        """Append a packet, encoded with its own timestamp."""
+        message = packet.message
+        datagram = b''.join((HEADER.pack((packet.SN << 32) | len(message), packet.timestamp), message, packet.mac))
+        self._append(packet.SN, datagram, arrival_time)
+
+    def write_datagram(self, datagram, arrival_time: float = None) -> None:
+        """Append a datagram as received, e.g. straight from the socket."""
+        self._append(HEADER.unpack_from(datagram)[0] >> 32, datagram, arrival_time)
+
+    def _append(self, SN: int, datagram, arrival_time: float) -> None:
+        if arrival_time is None:
+            arrival_time = self.clock()
+        size = len(datagram)
+        self.data.write(FRAME.pack(size))
+        self.data.write(datagram)
+        # The index entry goes out after its record, so a reader never sees an entry without data
+        self.index.write(INDEX.pack(SN, arrival_time, self.offset + FRAME.size, size))
+        self.offset += FRAME.size + size
+
+    def flush(self) -> None:
+        self.data.flush()
+        self.index.flush()
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"CaptureWriter(path={self.path!r}, offset={self.offset})"
+
+
+class ReplayClock:
+    """Clock reading the recorded time of the replay position; pass it as SlidingBook(clock=...)."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CaptureReader:
+    """Read a capture written by CaptureWriter through memory maps, without loading it.
+
+    `index` is a structured array (SN, time, offset, size) over the mapped index file, and
+    packets are decoded as PacketBatch views into the mapped data file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = self._map(path)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a capture file.")
+        self.view = memoryview(self.data)
+        self.index_map = self._map(path + '.idx')
+        index = np.frombuffer(self.index_map, dtype=INDEX_DTYPE, count=len(self.index_map) // INDEX_DTYPE.itemsize)
+        # Drop the tail of a capture whose writer stopped in the middle of a record
+        complete = index['offset'] + index['size'] <= len(self.data)
+        self.index = index if complete.all() else index[:int(np.argmin(complete))]
+        self.clock = ReplayClock()
+
+    @staticmethod
+    def _map(path):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b''  # Empty files cannot be mapped
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def select(self, start_SN: int = None, stop_SN: int = None, start_time: float = None,
+               stop_time: float = None) -> np.ndarray:
+        """Record numbers, in capture order, with start_SN <= SN < stop_SN arriving in [start_time, stop_time).
+
+        Time bounds are binary searches, since records are appended in arrival order; SN
+        bounds are a vectorized scan of the index entries within the time range.
+        """
+        times = self.index['time']
+        start = 0 if start_time is None else int(np.searchsorted(times, start_time, 'left'))
+        stop = len(times) if stop_time is None else int(np.searchsorted(times, stop_time, 'left'))
+        records = np.arange(start, max(start, stop))
+        if start_SN is None and stop_SN is None:
+            return records
+        SNs = self.index['SN'][records]
+        keep = np.ones(len(records), dtype=np.bool_)
+        if start_SN is not None:
+            keep &= SNs >= start_SN
+        if stop_SN is not None:
+            keep &= SNs < stop_SN
+        return records[keep]
+
+    def batch(self, records) -> PacketBatch:
+        """Decode the given records as a PacketBatch of views into the capture."""
+        entries = self.index[records]
+        return PacketBatch.from_buffer(self.view, sizes=entries['size'], offsets=entries['offset'])
+
+    def packets(self, records=None) -> list:
+        """Materialize records (all by default) as Packet instances."""
+        if records is None:
+            records = np.arange(len(self.index))
+        return self.batch(records).to_packets()
+
+    def replay(self, book, records=None, speed: float = None, batch_size: int = 64,
+               sleep=time.sleep, wallclock=time.monotonic):
+        """Feed records (all by default) into `book` in capture order and yield the pages it hands out.
+
+        Build the book with `clock=reader.clock`, so its clock reads the recorded arrival times
+        and pages time out as they did when the traffic was captured. Before every batch the
+        book is expired at the arrival time of the batch's first packet, and the batch itself
+        is added at the time of its last one. With `speed` None the capture is replayed as fast
+        as possible; otherwise recorded gaps are slept through at 1/speed of their length.
+        """
+        if records is None:
+            records = np.arange(len(self.index))
+        times = self.index['time'][records].tolist()
+        started = wallclock()
+        for start in range(0, len(records), batch_size):
+            stop = min(start + batch_size, len(records))
+            if speed is not None:
+                delay = (times[start] - times[0]) / speed - (wallclock() - started)
+                if delay > 0:
+                    sleep(delay)
+            self.clock.now = times[start]
+            yield from book.expire()
+            self.clock.now = times[stop - 1]
+            yield from book.add_packets(self.batch(records[start:stop]))
+
+    def close(self) -> None:
+        try:
+            self.view.release()
+            for mapped in (self.data, self.index_map):
+                if isinstance(mapped, mmap.mmap):
+                    mapped.close()
+        except BufferError:
+            pass  # Unmapped once the last batch view is gone
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return f"CaptureReader(path={self.path!r}, records={len(self)})"
@@ -0,0 +1,291 @@
+import time
+from .Packet import Packet, require_numpy
+from .Page import missing_ranges
+
+np = require_numpy('ColumnarPage')
+
+
+class ColumnarPage:
+    """Array-backed alternative to Page.
+
+    Every slot of the page lives in one contiguous buffer: typed columns for SNs, timestamps,
+    message/MAC lengths and verified tag bytes, a presence bitmap, then fixed-size payload
+    slots holding the message and then the MAC. No Packet objects are kept per slot.
+
+    Without a `payload_size`, slots start empty and are sized to the payload class of the
+    longest message seen (see Packet.ALLOWED_PAYLOAD_SIZES), growing to a larger class when
+    needed, so pages of small messages do not reserve 1 KiB per slot. A page keeps its size
+    when cleared, so a reused page does not reallocate.
+    """
+    MAX_MAC_SIZE = 64  # Large enough for every hashlib digest (sha512)
+
+    def __init__(self, page_size: int = 10, payload_size: int = None, mac_size: int = MAX_MAC_SIZE, buffer=None):
+        if payload_size is None and buffer is not None:
+            raise ValueError("A page in a caller's buffer needs a fixed payload_size.")
+        if payload_size is not None and payload_size not in Packet.ALLOWED_PAYLOAD_SIZES:
+            raise ValueError(f"Invalid payload size {payload_size}.")
+        self.page_size = page_size
+        self.mac_size = mac_size
+        self.growable = payload_size is None  # Slots follow the payload class of the messages
+        self.payload_size = min(Packet.ALLOWED_PAYLOAD_SIZES) if payload_size is None else payload_size
+
+        nbytes = self.nbytes(page_size, self.payload_size, mac_size)
+        if buffer is None:
+            buffer = bytearray(nbytes)
+        elif len(buffer) < nbytes:
+            raise ValueError(f"Buffer of {len(buffer)} bytes is too small, {nbytes} bytes are needed.")
+        self._carve(buffer)
+
+        self.last_update_time = time.time()
+        self.min_SN = None
+        self.max_SN = None
+        self.occupancy = 0
+        self.buffered_bytes = 0  # Message and MAC bytes held, for MemoryBudget accounting
+        self.released = False  # Set by SlidingBook while the page waits for reuse, to catch double releases
+
+    def _carve(self, buffer) -> None:
+        """Carve the columns and payload slots out of `buffer`, 8-byte columns first to keep them aligned."""
+        page_size = self.page_size
+        self.buffer = buffer
+        self.stride = self.payload_size + self.mac_size  # Bytes per slot in the data region
+        offset = 0
+        self.timestamps = np.frombuffer(buffer, dtype=np.float64, count=page_size, offset=offset)
+        offset += 8 * page_size
+        self.SNs = np.frombuffer(buffer, dtype=np.int64, count=page_size, offset=offset)
+        offset += 8 * page_size
+        self.message_lengths = np.frombuffer(buffer, dtype=np.uint16, count=page_size, offset=offset)
+        offset += 2 * page_size
+        self.mac_lengths = np.frombuffer(buffer, dtype=np.uint16, count=page_size, offset=offset)
+        offset += 2 * page_size
+        self.verifing_bytes = np.frombuffer(buffer, dtype=np.uint16, count=page_size, offset=offset)
+        offset += 2 * page_size
+        # Bit i of the little-endian bitmap is set when slot i holds a packet
+        self.presence_bits = np.frombuffer(buffer, dtype=np.uint8, count=(page_size + 7) // 8, offset=offset)
+        offset += (page_size + 7) // 8
+        # Bit i is set when slot i was filled by fill_missing_packets rather than received
+        self.filled_bits = np.frombuffer(buffer, dtype=np.uint8, count=(page_size + 7) // 8, offset=offset)
+        offset = self._data_offset(page_size)
+        self.data = np.frombuffer(buffer, dtype=np.uint8, count=page_size * self.stride, offset=offset)
+        self.data_view = memoryview(self.data)
+        self.slots = self.data.reshape(page_size, self.stride)
+        self.offsets = np.arange(page_size, dtype=np.int64) * self.stride  # Start of each slot in `data`
+
+    def _grow(self, payload_size: int) -> None:
+        """Move the page into a new buffer with `payload_size` byte message slots."""
+        old_slots, old_payload_size = self.slots, self.payload_size
+        columns = bytes(memoryview(self.buffer)[:self._data_offset(self.page_size)])
+        self.payload_size = payload_size
+        buffer = bytearray(self.nbytes(self.page_size, payload_size, self.mac_size))
+        buffer[:len(columns)] = columns
+        self._carve(buffer)
+        self.slots[:, :old_payload_size] = old_slots[:, :old_payload_size]
+        self.slots[:, payload_size:] = old_slots[:, old_payload_size:]
+
+    @staticmethod
+    def _data_offset(page_size: int) -> int:
+        header = (8 + 8 + 2 + 2 + 2) * page_size + 2 * ((page_size + 7) // 8)
+        return (header + 7) & ~7
+
+    @classmethod
+    def nbytes(cls, page_size: int, payload_size: int = max(Packet.ALLOWED_PAYLOAD_SIZES),
+               mac_size: int = MAX_MAC_SIZE) -> int:
+        """Number of buffer bytes a page with these dimensions needs."""
+        return cls._data_offset(page_size) + page_size * (payload_size + mac_size)
+
+    @property
+    def presence(self):
+        """Presence of each slot as a bool array, unpacked from the bitmap; a copy, not a view."""
+        return np.unpackbits(self.presence_bits, count=self.page_size, bitorder='little').view(np.bool_)
+
+    def add_packet(self, packet: Packet, now: float = None) -> bool:
+        """Copy the packet's fields into the page's columns."""
+        return self.add_record(packet.SN, packet.message, packet.mac, packet.timestamp, now)
+
+    def add_record(self, SN: int, message, mac=b'', timestamp: float = 0, now: float = None, pool=None) -> bool:
+        """Add a packet given as separate fields; `message` and `mac` may be any bytes-like object.
+
+        Raises ValueError, leaving the page unchanged, if the message or MAC does not fit.
+        `pool` is accepted for compatibility with Page; columnar pages keep no Packet objects.
+        """
+        message_length = len(message)
+        mac_length = len(mac)
+        if message_length > self.payload_size and (not self.growable or message_length >= len(Packet.SIZE_CLASSES)):
+            limit = self.payload_size if not self.growable else len(Packet.SIZE_CLASSES) - 1
+            raise ValueError(f"Message length {message_length} exceeds the page payload size of {limit} bytes.")
+        if mac_length > self.mac_size:
+            raise ValueError(f"MAC length {mac_length} exceeds the page MAC size of {self.mac_size} bytes.")
+
+        if self.min_SN is None:
+            min_SN = SN - SN % self.page_size
+        elif SN < self.min_SN or SN >= self.max_SN:
+            return False
+        else:
+            min_SN = self.min_SN
+        index = SN - min_SN
+        bit = 1 << (index & 7)
+        if self.presence_bits[index >> 3] & bit:
+            return False
+
+        if message_length > self.payload_size:
+            self._grow(Packet.SIZE_CLASSES[message_length])
+        self.min_SN = min_SN
+        self.max_SN = min_SN + self.page_size
+
+        start = index * self.stride
+        self.data_view[start:start + message_length] = message
+        mac_start = start + self.payload_size
+        self.data_view[mac_start:mac_start + mac_length] = mac
+
+        self.SNs[index] = SN
+        self.timestamps[index] = timestamp
+        self.message_lengths[index] = message_length
+        self.mac_lengths[index] = mac_length
+        self.verifing_bytes[index] = 0
+        self.presence_bits[index >> 3] |= bit
+        self.last_update_time = time.time() if now is None else now
+        self.occupancy += 1
+        self.buffered_bytes += message_length + mac_length
+        return True
+
+    def reload(self) -> None:
+        """Rebuild the in-memory state from the columns, for a buffer that already holds a page."""
+        present = np.flatnonzero(self.presence)
+        self.occupancy = len(present)
+        self.buffered_bytes = int(self.message_lengths[present].sum()) + int(self.mac_lengths[present].sum())
+        if self.occupancy:
+            SN = int(self.SNs[present[0]])
+            self.min_SN = SN - SN % self.page_size
+            self.max_SN = self.min_SN + self.page_size
+        else:
+            self.min_SN = None
+            self.max_SN = None
+
+    def discard(self, index: int) -> bool:
+        """Empty slot `index`; return True if it held a packet."""
+        if not self.presence_bits[index >> 3] >> (index & 7) & 1:
+            return False
+        self.presence_bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+        self.filled_bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+        self.occupancy -= 1
+        self.buffered_bytes -= int(self.message_lengths[index]) + int(self.mac_lengths[index])
+        return True
+
+    def is_full(self) -> bool:
+        """Check if the page is full."""
+        return self.occupancy == self.page_size
+
+    def clear(self) -> None:
+        """Clear the page; payload bytes are left in place and overwritten on reuse."""
+        self.presence_bits.fill(0)
+        self.filled_bits.fill(0)
+        self.message_lengths.fill(0)
+        self.mac_lengths.fill(0)
+        self.verifing_bytes.fill(0)
+        self.last_update_time = time.time()
+        self.min_SN = None
+        self.max_SN = None
+        self.occupancy = 0
+        self.buffered_bytes = 0
+
+    def bitmap(self) -> int:
+        """Presence bitmap of the page: bit i is set when slot i holds a packet."""
+        return int.from_bytes(self.presence_bits.tobytes(), 'little')
+
+    def missing_ranges(self) -> list:
+        """Half-open SN ranges [start, stop) of the missing packets, for retransmission requests."""
+        if self.min_SN is None:
+            return []  # The page does not know its SNs before its first packet
+        return missing_ranges(self.bitmap(), self.page_size, self.min_SN)
+
+    def release_packets(self, pool) -> None:
+        """Clear the page; it holds no Packet objects to return to `pool`."""
+        self.clear()
+
+    def fill_missing_packets(self, shared: bool = False) -> None:
+        """Mark missing slots as present with the appropriate SN and an empty message.
+
+        Columnar pages always fill through the presence mask; `shared` is accepted for
+        compatibility with Page.
+        """
+        if self.min_SN is None or self.max_SN is None:
+            return  # If the page has no packets yet, there's nothing to fill
+
+        missing = ~self.presence
+        self.SNs[missing] = self.min_SN + np.flatnonzero(missing)
+        self.timestamps[missing] = 0
+        self.message_lengths[missing] = 0
+        self.mac_lengths[missing] = 0
+        self.verifing_bytes[missing] = 0
+        self.occupancy += int(np.count_nonzero(missing))
+        self.filled_bits |= np.packbits(missing, bitorder='little')
+        self.presence_bits[:] = np.packbits(np.ones(self.page_size, dtype=np.bool_), bitorder='little')
+
+    def message(self, index: int) -> memoryview:
+        """Zero-copy view of the message stored in slot `index`."""
+        start = int(self.offsets[index])
+        return self.data_view[start:start + int(self.message_lengths[index])]
+
+    def mac(self, index: int) -> memoryview:
+        """Zero-copy view of the MAC stored in slot `index`."""
+        start = int(self.offsets[index]) + self.payload_size
+        return self.data_view[start:start + int(self.mac_lengths[index])]
+
+    def get_packet(self, index: int) -> Packet:
+        """Materialize slot `index` as a Packet, or None if the slot is empty."""
+        if not self.presence_bits[index >> 3] >> (index & 7) & 1:
+            return None
+        packet = Packet(SN=int(self.SNs[index]), message=bytes(self.message(index)),
+                        mac=bytes(self.mac(index)), timestamp=float(self.timestamps[index]))
+        packet.verifing_bytes = int(self.verifing_bytes[index])
+        return packet
+
+    @property
+    def packets(self) -> list:
+        """Packet view of the page as a list, like Page.packets; allocates one Packet per slot."""
+        packets = [None] * self.page_size
+        for index in np.flatnonzero(self.presence).tolist():
+            packets[index] = self.get_packet(index)
+        return packets
+
+    def export(self):
+        """Return the SNs, timestamps, message lengths and payload rows of the present slots, in SN order."""
+        present = self.presence
+        return (self.SNs[present], self.timestamps[present], self.message_lengths[present],
+                self.slots[present, :self.payload_size])
+
+    def buffers(self, fill_size: int = None) -> list:
+        """Zero-copy views of the page's messages in SN order.
+
+        Slots that were not received, whether still empty or filled by fill_missing_packets,
+        are skipped, or stand for `fill_size` zero bytes each when it is given.
+        """
+        zeros = bytes(fill_size) if fill_size else None
+        received = self.presence & ~np.unpackbits(self.filled_bits, count=self.page_size, bitorder='little').view(np.bool_)
+        buffers = []
+        for index, (present, length) in enumerate(zip(received.tolist(), self.message_lengths.tolist())):
+            if not present:
+                if zeros is not None:
+                    buffers.append(zeros)
+            elif length:
+                start = index * self.stride
+                buffers.append(self.data_view[start:start + length])
+        return buffers
+
+    def export_into(self, buffer, fill_size: int = None, offset: int = 0) -> int:
+        """Write the page's messages in SN order into a preallocated buffer and return the bytes written."""
+        view = memoryview(buffer).cast('B')
+        position = offset
+        for message in self.buffers(fill_size):
+            end = position + len(message)
+            if end > len(view):
+                raise ValueError(f"Buffer of {len(view)} bytes is too small to export the page.")
+            view[position:end] = message
+            position = end
+        return position - offset
+
+    def to_bytes(self, fill_size: int = None) -> bytes:
+        """Concatenate the page's messages in SN order."""
+        return b''.join(self.buffers(fill_size))
+
+    def __repr__(self):
+        return f"ColumnarPage(size={self.page_size}, payload_size={self.payload_size}, SNs={self.SNs[self.presence]}, occupancy={self.occupancy})"
@@ -1,25 +1,79 @@
 import struct
 import time
 import hmac
+import hashlib
+
+HEADER = struct.Struct('!Qd')  # Combined SN and message length, then the timestamp
+HEADER_SIZE = HEADER.size
+HEADER_FIELDS = [('SN_and_size', '>u8'), ('timestamp', '>f8')]  # HEADER as a NumPy dtype, see header_dtype()
+_HEADER_DTYPE = None  # Built by header_dtype()
+_numpy = None  # NumPy module once looked up, False if it is not installed
+
+
+def optional_numpy():
+    """Return the NumPy module, or None if it is not installed; the import is attempted once."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+def require_numpy(feature: str):
+    """Return the NumPy module, raising an ImportError naming `feature` if it is not installed."""
+    np = optional_numpy()
+    if np is None:
+        raise ImportError(f"{feature} needs NumPy; install it with `pip install .[numpy]`.")
+    return np
+
+
+def header_dtype():
+    """NumPy dtype of HEADER, built on first use so importing this module does not load NumPy."""
+    global _HEADER_DTYPE
+    if _HEADER_DTYPE is None:
+        np = require_numpy('HEADER_DTYPE')
+        _HEADER_DTYPE = np.dtype(HEADER_FIELDS)
+    return _HEADER_DTYPE
+
+def __getattr__(name: str):
+    # Keeps the HEADER_DTYPE module attribute working without importing NumPy up front
+    if name == 'HEADER_DTYPE':
+        return header_dtype()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def size_classes(allowed_sizes: list) -> tuple:
+    """Table mapping every message length up to the largest allowed size to its payload size."""
+    table = []
+    for size in sorted(allowed_sizes):
+        table.extend([size] * (size + 1 - len(table)))
+    return tuple(table)
+
 
 class Packet:
     ALLOWED_PAYLOAD_SIZES = [0, 128, 256, 512, 1024]
+    SIZE_CLASSES = size_classes(ALLOWED_PAYLOAD_SIZES)  # Payload size indexed by message length
+    MAX_MESSAGE_SIZE = len(SIZE_CLASSES) - 1  # Longest message a packet may carry
+    __slots__ = ('SN', 'timestamp', 'message', 'mac', 'payload_size', 'verifing_bytes')
 
     def __init__(self, SN: int, message: bytes, mac: bytes = b'', timestamp: float = 0):
         self.SN = SN
         self.timestamp = timestamp 
         self.message = message
         self.mac = mac
-        self.payload_size = self._determine_payload_size(len(message))  # Determine the payload size based on the message length
+        try:
+            self.payload_size = self.SIZE_CLASSES[len(message)]  # Payload size class of the message, inlined for speed
+        except IndexError:
+            self._determine_payload_size(len(message))  # Raises ValueError naming the limit
         self.verifing_bytes = 0  #number of tag bytes verifying the packet
         # self.MAC_Size = hmac.new(b'',b'key', digestmod=digestmod).digest_size
 
     def _determine_payload_size(self, message_length: int) -> int:
         """Determine the payload size based on the message length."""
-        for size in self.ALLOWED_PAYLOAD_SIZES:
-            if message_length <= size:
-                return size
-        raise ValueError(f"Message length {message_length} exceeds the maximum allowed size of 1024 bytes.")
+        if message_length < len(self.SIZE_CLASSES):
+            return self.SIZE_CLASSES[message_length]
+        raise ValueError(f"Message length {message_length} exceeds the maximum allowed size of {len(self.SIZE_CLASSES) - 1} bytes.")
 
     # def to_bytes(self) -> bytes:
     #     """Convert the packet to bytes for transmission."""
@@ -29,13 +83,18 @@ class Packet:
     #     return struct.pack(f'!Qd{self.payload_size}s{len(self.mac)}s', 
     #                        SN_and_size, self.timestamp, self.message.ljust(self.payload_size, b'\0'), self.mac)
 
-    def to_bytes(self) -> bytes:
-        """Convert the packet to bytes for transmission."""
+    def to_bytes(self, timestamp: float = None) -> bytes:
+        """Convert the packet to bytes for transmission.
+
+        Senders encoding many packets at once can pass one `timestamp` for all of them,
+        which also saves a clock read per packet.
+        """
         # Combine SN and payload size into a single 8-byte value
         SN_and_size = (self.SN << 32) | len(self.message)
-        # Using struct.pack to efficiently serialize the packet
-        return struct.pack(f'!Qd{len(self.message)}s{len(self.mac)}s', 
-                        SN_and_size, time.time(), self.message, self.mac)
+        if timestamp is None:
+            timestamp = time.time()
+        # One fixed header struct for every packet; the payload is appended as it is
+        return b''.join((HEADER.pack(SN_and_size, timestamp), self.message, self.mac))
 
     # @classmethod
     # def from_bytes(cls, data: bytes):
@@ -61,8 +120,8 @@ class Packet:
     @classmethod
     def from_bytes(cls, data: bytes, digestmod: str= 'sha384'):
         """Create a Packet instance from a bytes object."""
-        # Unpack the combined SN and payload size (first 8 bytes)
-        SN_and_size = struct.unpack('!Q', data[:8])[0]
+        # Unpack the combined SN and payload size and the timestamp in one go, without slicing
+        SN_and_size, timestamp = HEADER.unpack_from(data)
         SN = SN_and_size >> 32  # Extract SN (upper 4 bytes)
         payload_size = SN_and_size & 0xFFFFFFFF  # Extract payload size (lower 4 bytes)
         
@@ -70,9 +129,6 @@ class Packet:
         # if payload_size not in cls.ALLOWED_PAYLOAD_SIZES:
         #     raise ValueError(f"Invalid payload size {payload_size}.")
 
-        # Extract the timestamp (next 8 bytes)
-        timestamp = struct.unpack('!d', data[8:16])[0]
-        
         # Extract message and MAC
         message = data[16:16+payload_size]  # Extract message without needing to strip padding
         mac_start = 16 + payload_size
@@ -86,3 +142,165 @@ class Packet:
         return f"Packet(SN={self.SN}, message={self.message}, mac={self.mac}, timestamp={self.timestamp}, payload_size={self.payload_size}, verified_bytes={self.verifing_bytes})"
 
 
+class PacketPool:
+    """Free list of Packet instances, so buffered packets can be recycled instead of reallocated.
+
+    Only release packets nobody references anymore, e.g. those of a page the consumer is done with.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.free = []
+
+    def acquire(self, SN: int, message: bytes, mac: bytes = b'', timestamp: float = 0) -> Packet:
+        """Return a packet with the given fields, reusing a released one when available."""
+        if not self.free:
+            return Packet(SN=SN, message=message, mac=mac, timestamp=timestamp)
+        payload_size = self.free[-1]._determine_payload_size(len(message))
+        packet = self.free.pop()
+        packet.payload_size = payload_size
+        packet.SN = SN
+        packet.timestamp = timestamp
+        packet.message = message
+        packet.mac = mac
+        packet.verifing_bytes = 0
+        return packet
+
+    def release(self, packet: Packet) -> None:
+        """Hand a packet back for reuse."""
+        if len(self.free) < self.max_size:
+            packet.message = packet.mac = b''  # Drop the payload references right away
+            self.free.append(packet)
+
+    def __len__(self):
+        return len(self.free)
+
+    def __repr__(self):
+        return f"PacketPool(free={len(self.free)}, max_size={self.max_size})"
+
+
+class PacketBatch:
+    """A batch of decoded packets kept as arrays plus zero-copy views into the receive buffer.
+
+    The views stay valid only as long as the receive buffer is not reused, so hand the batch
+    to SlidingBook.add_packets (which copies into its pages) before receiving into it again.
+    Batches decoded from datagram slots build their views on first access to `messages` or
+    `macs`; copy_fields() copies the payloads out without creating views at all.
+    """
+
+    def __init__(self, SNs: 'np.ndarray', timestamps: 'np.ndarray', message_lengths: 'np.ndarray',
+                 messages: list = None, macs: list = None, source=None, spans: tuple = None):
+        self.SNs = SNs
+        self.timestamps = timestamps
+        self.message_lengths = message_lengths
+        self._messages = messages
+        self._macs = macs
+        self.source = source  # Receive buffer the spans point into
+        self.spans = spans  # (message starts, MAC starts, ends) as lists of offsets into `source`
+
+    @property
+    def messages(self) -> list:
+        if self._messages is None:
+            view = memoryview(self.source).cast('B')
+            starts, mac_starts, _ = self.spans
+            self._messages = [view[start:stop] for start, stop in zip(starts, mac_starts)]
+        return self._messages
+
+    @property
+    def macs(self) -> list:
+        if self._macs is None:
+            view = memoryview(self.source).cast('B')
+            _, mac_starts, ends = self.spans
+            self._macs = [view[start:stop] for start, stop in zip(mac_starts, ends)]
+        return self._macs
+
+    def copy_fields(self) -> tuple:
+        """Return the messages and MACs as lists of bytes, sliced straight out of a bytes source."""
+        if self.spans is None or not isinstance(self.source, bytes):
+            return [bytes(message) for message in self.messages], [bytes(mac) for mac in self.macs]
+        source = self.source
+        starts, mac_starts, ends = self.spans
+        return ([source[start:stop] for start, stop in zip(starts, mac_starts)],
+                [source[start:stop] for start, stop in zip(mac_starts, ends)])
+
+    @classmethod
+    def from_buffer(cls, buffer, sizes=None, stride: int = None, mac_size: int = None, digestmod: str = 'sha384',
+                    offsets=None):
+        """Decode many packets from one buffer without copying their payloads.
+
+        With `sizes`, the buffer holds one datagram per entry, as filled by a recvmmsg-style
+        receive: datagram i starts at `offsets[i]` if given, at i * `stride` if a stride is
+        given, otherwise right after datagram i - 1. Without `sizes`, the buffer is a
+        concatenation of framed packets that each carry a `mac_size`-byte MAC (the digest size
+        of `digestmod` by default).
+        """
+        np = require_numpy('PacketBatch')  # Batch decoding is the vectorized path; NumPy is loaded on first use
+        view = memoryview(buffer).cast('B')
+        if sizes is None:
+            return cls._from_frames(view, hashlib.new(digestmod).digest_size if mac_size is None else mac_size)
+
+        sizes = np.asarray(sizes, dtype=np.int64)
+        if offsets is not None:
+            offsets = np.asarray(offsets, dtype=np.int64)
+        elif stride is None:
+            offsets = np.zeros(len(sizes), dtype=np.int64)
+            np.cumsum(sizes[:-1], out=offsets[1:])
+        else:
+            offsets = np.arange(len(sizes), dtype=np.int64) * stride
+        if len(sizes) and ((sizes < HEADER_SIZE).any() or (offsets + sizes).max() > len(view)):
+            raise ValueError("Datagram sizes do not fit the buffer.")
+
+        # Gather only the 16 header bytes of every datagram and decode them in one vectorized step
+        raw = np.frombuffer(view, dtype=np.uint8)
+        headers = raw[offsets[:, None] + np.arange(HEADER_SIZE)].view(header_dtype()).ravel()
+        SN_and_size = headers['SN_and_size']
+        SNs = (SN_and_size >> np.uint64(32)).astype(np.int64)
+        message_lengths = (SN_and_size & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        if (HEADER_SIZE + message_lengths > sizes).any():
+            raise ValueError("Message length exceeds the datagram size.")
+        if (message_lengths > Packet.MAX_MESSAGE_SIZE).any():
+            raise ValueError(f"Message length exceeds the maximum of {Packet.MAX_MESSAGE_SIZE} bytes.")
+
+        spans = ((offsets + HEADER_SIZE).tolist(), (offsets + HEADER_SIZE + message_lengths).tolist(),
+                 (offsets + sizes).tolist())
+        return cls(SNs, headers['timestamp'].astype(np.float64), message_lengths,
+                   source=buffer if isinstance(buffer, bytes) else view, spans=spans)
+
+    @classmethod
+    def _from_frames(cls, view: memoryview, mac_size: int):
+        np = require_numpy('PacketBatch')
+        SNs, timestamps, message_lengths, messages, macs = [], [], [], [], []
+        offset = 0
+        end = len(view)
+        while offset < end:
+            if offset + HEADER_SIZE > end:
+                raise ValueError(f"Truncated packet header at offset {offset}.")
+            SN_and_size, timestamp = HEADER.unpack_from(view, offset)
+            message_length = SN_and_size & 0xFFFFFFFF
+            if message_length > Packet.MAX_MESSAGE_SIZE:
+                raise ValueError(f"Packet with SN {SN_and_size >> 32} declares a {message_length}-byte message, "
+                                 f"more than the maximum of {Packet.MAX_MESSAGE_SIZE} bytes.")
+            message_start = offset + HEADER_SIZE
+            mac_start = message_start + message_length
+            offset = mac_start + mac_size
+            if offset > end:
+                raise ValueError(f"Truncated packet with SN {SN_and_size >> 32}.")
+            SNs.append(SN_and_size >> 32)
+            timestamps.append(timestamp)
+            message_lengths.append(message_length)
+            messages.append(view[message_start:mac_start])
+            macs.append(view[mac_start:offset])
+        return cls(np.array(SNs, dtype=np.int64), np.array(timestamps, dtype=np.float64),
+                   np.array(message_lengths, dtype=np.int64), messages, macs)
+
+    def to_packets(self) -> list:
+        """Materialize the batch as Packet instances, copying every payload."""
+        return [Packet(SN=SN, message=bytes(message), mac=bytes(mac), timestamp=timestamp)
+                for SN, message, mac, timestamp in zip(self.SNs.tolist(), self.messages, self.macs, self.timestamps.tolist())]
+
+    def __len__(self):
+        return len(self.SNs)
+
+    def __repr__(self):
+        return f"PacketBatch(size={len(self)}, SNs={self.SNs})"
+
@@ -1,31 +1,105 @@
-import numpy as np
 import time
 from .Packet import Packet
 
+
+def missing_ranges(bitmap: int, page_size: int, base: int = 0) -> list:
+    """Return the half-open SN ranges [start, stop) of the zero bits among the first page_size bits."""
+    missing = ~bitmap & ((1 << page_size) - 1)
+    ranges = []
+    while missing:
+        start = (missing & -missing).bit_length() - 1
+        run = missing >> start
+        length = (~run & (run + 1)).bit_length() - 1  # Number of consecutive missing slots
+        ranges.append((base + start, base + start + length))
+        missing &= ~(((1 << length) - 1) << start)
+    return ranges
+
+
+class _MissingPacket(Packet):
+    """Read-only empty packet, shared by every slot that fill_missing_packets(shared=True) fills."""
+    __slots__ = ()
+
+    def __init__(self):
+        for name, value in zip(Packet.__slots__, (-1, 0, b'', b'', 0, 0)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Page.MISSING is shared by every page and cannot be modified.")
+
+    __delattr__ = __setattr__
+
+
 class Page:
+    MISSING = _MissingPacket()  # Read-only placeholder for fill_missing_packets(shared=True)
+
     def __init__(self, page_size: int = 10):
         self.page_size = page_size
-        self.packets = np.full(page_size, None, dtype=object)  # Use a NumPy array to hold Packet instances
+        self.packets = [None] * page_size  # Packet instances by slot, a plain list so NumPy is not needed
+        self._empty = (None,) * page_size  # Slice-assigned by clear() to reset the slots in place
         self.last_update_time = time.time()
         self.min_SN = None
         self.max_SN = None
         self.occupancy = 0  # Track the number of packets in the page
+        self.buffered_bytes = 0  # Message and MAC bytes held, for MemoryBudget accounting
+        self.present_bits = 0  # Bit i is set when slot i holds a packet
+        self.filled_bits = 0  # Bit i is set when slot i was filled by fill_missing_packets, not received
+        self.released = False  # Set by SlidingBook while the page waits for reuse, to catch double releases
+
+    def add_packet(self, packet: Packet, now: float = None) -> bool:
+        """Check if the SN is in the range of the page_size and add the packet.
 
-    def add_packet(self, packet: Packet) -> bool:
-        """Check if the SN is in the range of the page_size and add the packet."""
+        `now` lets a caller that adds many packets at once share one timestamp.
+        """
         SN = packet.SN
+        slot = SN % self.page_size
 
         if self.min_SN is None:
-            self.min_SN = SN - SN % self.page_size
+            self.min_SN = SN - slot
             self.max_SN = self.min_SN + self.page_size
         elif SN < self.min_SN or SN >= self.max_SN:
             return False
-        elif self.packets[SN % self.page_size] is not None:
+        elif self.packets[slot] is not None:
             return False
 
-        self.packets[SN % self.page_size] = packet
-        self.last_update_time = time.time()
+        self.packets[slot] = packet
+        self.present_bits |= 1 << slot
+        self.last_update_time = time.time() if now is None else now
         self.occupancy += 1
+        self.buffered_bytes += len(packet.message) + len(packet.mac)
+        return True
+
+    def add_record(self, SN: int, message, mac=b'', timestamp: float = 0, now: float = None, pool=None) -> bool:
+        """Build a Packet from separate fields and add it; bytes-like fields are copied to bytes.
+
+        The SN is checked before anything is built, so a duplicate allocates nothing. With a
+        PacketPool as `pool`, the Packet is taken from it.
+        """
+        if self.min_SN is not None and (SN < self.min_SN or SN >= self.max_SN or self.packets[SN % self.page_size] is not None):
+            return False  # Checked up front so rejected records allocate nothing
+        if type(message) is not bytes:
+            message = bytes(message)
+        if type(mac) is not bytes:
+            mac = bytes(mac)
+        packet = Packet(SN, message, mac, timestamp) if pool is None else pool.acquire(SN, message, mac, timestamp)
+        return self.add_packet(packet, now)
+
+    def release_packets(self, pool) -> None:
+        """Return every packet of the page to a PacketPool and clear the page."""
+        for packet in self.packets:
+            if packet is not None and packet is not self.MISSING:
+                pool.release(packet)
+        self.clear()
+
+    def discard(self, index: int) -> bool:
+        """Empty slot `index`; return True if it held a packet."""
+        packet = self.packets[index]
+        if packet is None:
+            return False
+        self.packets[index] = None
+        self.present_bits &= ~(1 << index)
+        self.filled_bits &= ~(1 << index)
+        self.occupancy -= 1
+        self.buffered_bytes -= len(packet.message) + len(packet.mac)
         return True
 
     def is_full(self) -> bool:
@@ -34,30 +108,78 @@ class Page:
 
     def clear(self) -> None:
         """Clear the page by deleting all Packet instances."""
-        self.packets.fill(None)  # Use NumPy's fill method to reset the array
+        self.packets[:] = self._empty
         self.last_update_time = time.time()
         self.min_SN = None
         self.max_SN = None
         self.occupancy = 0
+        self.buffered_bytes = 0
+        self.present_bits = 0
+        self.filled_bits = 0
+
+    def bitmap(self) -> int:
+        """Presence bitmap of the page: bit i is set when slot i holds a packet."""
+        return self.present_bits
+
+    def missing_ranges(self) -> list:
+        """Half-open SN ranges [start, stop) of the missing packets, for retransmission requests."""
+        if self.min_SN is None:
+            return []  # The page does not know its SNs before its first packet
+        return missing_ranges(self.present_bits, self.page_size, self.min_SN)
+
+    def fill_missing_packets(self, shared: bool = False) -> None:
+        """Fill missing packets with the appropriate SN and an empty message (b'').
 
-    def fill_missing_packets(self) -> None:
-        """Fill missing packets with the appropriate SN and an empty message (b'')."""
+        With `shared`, every missing slot points to the single Page.MISSING placeholder instead
+        of a new Packet, so filling a lossy page allocates nothing per slot.
+        """
         if self.min_SN is None or self.max_SN is None:
             return  # If the page has no packets yet, there's nothing to fill
 
-        # Find the indices where packets are missing
-        missing_indices = np.where(self.packets == None)[0]
-        
-        if len(missing_indices) > 0:
-            # Create the sequence numbers for the missing packets
-            missing_SNs = self.min_SN + missing_indices
-            
-            # Vectorized creation of Packet instances
-            new_packets = np.array([Packet(SN=sn, message=b'') for sn in missing_SNs], dtype=object)
-            
-            # Assign the new packets to the missing indices
-            self.packets[missing_indices] = new_packets
-            self.occupancy += len(missing_indices)
+        # Walk the runs of missing slots from the presence bitmap
+        for start, stop in self.missing_ranges():
+            first, last = start - self.min_SN, stop - self.min_SN
+            if shared:
+                self.packets[first:last] = [self.MISSING] * (last - first)
+            else:
+                self.packets[first:last] = [Packet(SN=sn, message=b'') for sn in range(start, stop)]
+            self.occupancy += last - first
+        full = (1 << self.page_size) - 1
+        self.filled_bits |= ~self.present_bits & full
+        self.present_bits = full
+
+    def buffers(self, fill_size: int = None) -> list:
+        """Messages of the page in SN order, without copying them.
+
+        Slots that were not received, whether still empty or filled by fill_missing_packets,
+        are skipped, or stand for `fill_size` zero bytes each when it is given.
+        """
+        zeros = bytes(fill_size) if fill_size else None
+        filled = self.filled_bits
+        buffers = []
+        for index, packet in enumerate(self.packets):
+            if packet is None or filled >> index & 1:
+                if zeros is not None:
+                    buffers.append(zeros)
+            elif packet.message:
+                buffers.append(packet.message)
+        return buffers
+
+    def export_into(self, buffer, fill_size: int = None, offset: int = 0) -> int:
+        """Write the page's messages in SN order into a preallocated buffer and return the bytes written."""
+        view = memoryview(buffer).cast('B')
+        position = offset
+        for message in self.buffers(fill_size):
+            end = position + len(message)
+            if end > len(view):
+                raise ValueError(f"Buffer of {len(view)} bytes is too small to export the page.")
+            view[position:end] = message
+            position = end
+        return position - offset
+
+    def to_bytes(self, fill_size: int = None) -> bytes:
+        """Concatenate the page's messages in SN order."""
+        return b''.join(self.buffers(fill_size))
 
     def __repr__(self):
         return f"Page(size={self.page_size}, packets={self.packets}, occupancy={self.occupancy})"
@@ -0,0 +1,209 @@
+import struct
+from .Packet import Packet, require_numpy
+
+np = require_numpy('ParityCodec')
+
+# Timestamp, message length and MAC length of a data packet, coded in front of its MAC so a
+# recovered packet comes back exactly as it was sent
+TRAILER = struct.Struct('!dHH')
+
+
+def _gf_tables():
+    """Exponent, logarithm, multiplication and inverse tables of GF(256) with polynomial 0x11d."""
+    exp = np.zeros(510, dtype=np.uint8)
+    log = np.zeros(256, dtype=np.int64)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11d
+    exp[255:] = exp[:255]
+    nonzero = np.arange(1, 256)
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    mul[1:, 1:] = exp[log[nonzero][:, None] + log[nonzero][None, :]]
+    inv = np.zeros(256, dtype=np.uint8)
+    inv[1:] = exp[255 - log[nonzero]]
+    return mul, inv
+
+GF_MUL, GF_INV = _gf_tables()  # GF_MUL[a, b] is a * b; GF_INV[a] is 1 / a
+
+
+class ParityCodec:
+    """Per-page parity: the last `k` slots of every page carry repair packets for the others.
+
+    With k=1 the repair packet is the XOR of the page's data packets. With k > 1 repair packet
+    j is a Cauchy Reed-Solomon combination over GF(256), so any k missing data packets can be
+    rebuilt from any k repair packets. Messages are padded to the longest one; the MAC field
+    of a repair packet codes each packet's timestamp, lengths and MAC.
+
+    The sender maps data packets to SNs with data_SN() and sends encode()'s repair packets
+    after each page. Pass the codec as `parity` to SlidingBook to repair pages on receipt.
+    """
+
+    def __init__(self, page_size: int, k: int = 1):
+        if not 1 <= k < page_size:
+            raise ValueError(f"Need 1 <= k < page_size, got k={k} for pages of {page_size}.")
+        if page_size > 256:
+            raise ValueError("GF(256) parity supports pages of at most 256 packets.")
+        self.page_size = page_size
+        self.k = k
+        self.data_slots = page_size - k
+        if k == 1:
+            self.matrix = np.ones((1, self.data_slots), dtype=np.uint8)
+        else:
+            # Cauchy matrix 1 / (x_j + y_i) with distinct x_j = j and y_i = k + i; every square
+            # submatrix of it is invertible
+            rows = np.arange(k)[:, None]
+            columns = k + np.arange(self.data_slots)[None, :]
+            self.matrix = GF_INV[rows ^ columns]
+
+    def data_SN(self, index: int) -> int:
+        """SN of the `index`-th data packet of a stream, skipping the repair slots of each page."""
+        return index // self.data_slots * self.page_size + index % self.data_slots
+
+    def _combine(self, rows: np.ndarray, symbols: np.ndarray) -> np.ndarray:
+        """Rows of GF(256) linear combinations: result[j] = sum over i of rows[j, i] * symbols[i]."""
+        if (rows == 1).all():
+            # Plain XOR parity; every row is the same sum
+            return np.repeat(np.bitwise_xor.reduce(symbols, axis=0, keepdims=True), len(rows), axis=0)
+        return np.bitwise_xor.reduce(GF_MUL[rows[:, :, None], symbols[None, :, :]], axis=1)
+
+    def encode(self, packets: list, timestamp: float = 0) -> list:
+        """Return the k repair packets for the data packets of one page, given in slot order."""
+        if len(packets) != self.data_slots:
+            raise ValueError(f"A page carries {self.data_slots} data packets, got {len(packets)}.")
+        message_size = max(len(packet.message) for packet in packets)
+        trailer_size = TRAILER.size + max(len(packet.mac) for packet in packets)
+        messages = np.zeros((self.data_slots, message_size), dtype=np.uint8)
+        trailers = np.zeros((self.data_slots, trailer_size), dtype=np.uint8)
+        self._pack(packets, messages, trailers)
+        base = packets[0].SN - packets[0].SN % self.page_size
+        repair_messages = self._combine(self.matrix, messages)
+        repair_trailers = self._combine(self.matrix, trailers)
+        return [Packet(SN=base + self.data_slots + j, message=repair_messages[j].tobytes(),
+                       mac=repair_trailers[j].tobytes(), timestamp=timestamp) for j in range(self.k)]
+
+    @staticmethod
+    def _pack(packets: list, messages: np.ndarray, trailers: np.ndarray) -> None:
+        """Write the zero-padded message and trailer symbols of packets into rows of `messages` and `trailers`."""
+        for row, packet in enumerate(packets):
+            messages[row, :len(packet.message)] = np.frombuffer(packet.message, dtype=np.uint8)
+            trailer = TRAILER.pack(packet.timestamp, len(packet.message), len(packet.mac)) + bytes(packet.mac)
+            trailers[row, :len(trailer)] = np.frombuffer(trailer, dtype=np.uint8)
+
+    def _read_slots(self, page, slots: list, message_size: int, trailer_size: int):
+        """Message and trailer symbols of present slots of a Page or ColumnarPage, or None if they do not fit."""
+        count = len(slots)
+        if hasattr(page, 'presence'):
+            message_lengths = page.message_lengths[slots].astype(np.int64)
+            mac_lengths = page.mac_lengths[slots].astype(np.int64)
+            mac_size = trailer_size - TRAILER.size
+            if (message_lengths > message_size).any() or (mac_lengths > mac_size).any():
+                return None
+            # Gather straight from the payload rows, zeroing the stale bytes past each length
+            messages = page.slots[slots, :message_size].copy()
+            messages[np.arange(message_size)[None, :] >= message_lengths[:, None]] = 0
+            trailers = np.zeros((count, trailer_size), dtype=np.uint8)
+            width = min(mac_size, page.mac_size)
+            macs = page.slots[slots, page.payload_size:page.payload_size + width]
+            trailers[:, TRAILER.size:TRAILER.size + width] = np.where(
+                np.arange(width)[None, :] < mac_lengths[:, None], macs, 0)
+            trailers[:, :8] = page.timestamps[slots].astype('>f8').view(np.uint8).reshape(count, 8)
+            trailers[:, 8:10] = message_lengths.astype('>u2').view(np.uint8).reshape(count, 2)
+            trailers[:, 10:12] = mac_lengths.astype('>u2').view(np.uint8).reshape(count, 2)
+            return messages, trailers
+
+        packets = [page.packets[slot] for slot in slots]
+        if any(len(packet.message) > message_size or TRAILER.size + len(packet.mac) > trailer_size for packet in packets):
+            return None
+        messages = np.zeros((count, message_size), dtype=np.uint8)
+        trailers = np.zeros((count, trailer_size), dtype=np.uint8)
+        self._pack(packets, messages, trailers)
+        return messages, trailers
+
+    def _invert(self, matrix: list) -> list:
+        """Invert a small square matrix over GF(256) by Gauss-Jordan elimination."""
+        size = len(matrix)
+        rows = [list(row) + [int(i == r) for i in range(size)] for r, row in enumerate(matrix)]
+        for column in range(size):
+            pivot = next(r for r in range(column, size) if rows[r][column])
+            rows[column], rows[pivot] = rows[pivot], rows[column]
+            scale = int(GF_INV[rows[column][column]])
+            rows[column] = [int(GF_MUL[scale, value]) for value in rows[column]]
+            for r in range(size):
+                factor = rows[r][column]
+                if r != column and factor:
+                    rows[r] = [value ^ int(GF_MUL[factor, pivot_value])
+                               for value, pivot_value in zip(rows[r], rows[column])]
+        return [row[size:] for row in rows]
+
+    def recover(self, page, now: float = None) -> int:
+        """Rebuild the missing data packets of a page once it holds enough packets.
+
+        Returns the number of data packets rebuilt. When every data packet is then present,
+        the repair packets are dropped and all k repair slots hold empty per-page placeholders,
+        so the page is full and consumers see only data, whether or not packets were lost.
+        """
+        if page.min_SN is None or page.occupancy < self.data_slots:
+            return 0
+        present = page.bitmap()
+        missing = [slot for slot in range(self.data_slots) if not present >> slot & 1]
+        repairs = [slot for slot in range(self.data_slots, self.page_size) if present >> slot & 1]
+        if len(missing) > len(repairs):
+            return 0
+
+        if missing:
+            repairs = repairs[:len(missing)]
+            received = [slot for slot in range(self.data_slots) if present >> slot & 1]
+            # Repair packets are padded to the page's longest message and trailer
+            if hasattr(page, 'presence'):
+                message_size, trailer_size = int(page.message_lengths[repairs[0]]), int(page.mac_lengths[repairs[0]])
+                if (page.message_lengths[repairs] != message_size).any() or (page.mac_lengths[repairs] != trailer_size).any():
+                    return 0
+                repair_messages = page.slots[repairs, :message_size].copy()
+                repair_trailers = page.slots[repairs, page.payload_size:page.payload_size + trailer_size].copy()
+            else:
+                message_size, trailer_size = len(page.packets[repairs[0]].message), len(page.packets[repairs[0]].mac)
+                repair_messages = np.zeros((len(repairs), message_size), dtype=np.uint8)
+                repair_trailers = np.zeros((len(repairs), trailer_size), dtype=np.uint8)
+                for row, slot in enumerate(repairs):
+                    packet = page.packets[slot]
+                    if len(packet.message) != message_size or len(packet.mac) != trailer_size:
+                        return 0
+                    repair_messages[row] = np.frombuffer(packet.message, dtype=np.uint8)
+                    repair_trailers[row] = np.frombuffer(packet.mac, dtype=np.uint8)
+            if trailer_size < TRAILER.size:
+                return 0
+            symbols = self._read_slots(page, received, message_size, trailer_size)
+            if symbols is None:
+                return 0  # The repair packets do not match this page's data
+
+            # Subtract the received data from the repair symbols, leaving combinations of the missing data
+            rows = self.matrix[[slot - self.data_slots for slot in repairs]]
+            if received:
+                repair_messages ^= self._combine(rows[:, received], symbols[0])
+                repair_trailers ^= self._combine(rows[:, received], symbols[1])
+            inverse = np.array(self._invert(rows[:, missing].tolist()), dtype=np.uint8)
+            messages = self._combine(inverse, repair_messages)
+            trailers = self._combine(inverse, repair_trailers)
+
+            rebuilt = []
+            for row in range(len(missing)):
+                timestamp, message_length, mac_length = TRAILER.unpack_from(trailers[row])
+                if message_length > message_size or TRAILER.size + mac_length > trailer_size:
+                    return 0  # Corrupt repair data; leave the page to time out
+                rebuilt.append((messages[row, :message_length], trailers[row, TRAILER.size:TRAILER.size + mac_length],
+                                timestamp))
+            for slot, (message, mac, timestamp) in zip(missing, rebuilt):
+                page.add_record(page.min_SN + slot, message.tobytes(), mac.tobytes(), timestamp, now)
+        # Repair packets are not payload: replace them so every repair slot reads as an empty packet.
+        # The slots are given empty records rather than filled, so fill_size does not pad them
+        for slot in range(self.data_slots, self.page_size):
+            page.discard(slot)
+            page.add_record(page.min_SN + slot, b'', b'', 0, now)
+        return len(missing)
+
+    def __repr__(self):
+        return f"ParityCodec(page_size={self.page_size}, k={self.k})"
@@ -0,0 +1,138 @@
+import asyncio
+import collections
+import itertools
+import time
+from .Packet import Packet, PacketBatch, HEADER_SIZE, optional_numpy
+
+
+class BookReceiver(asyncio.DatagramProtocol):
+    """asyncio datagram protocol that feeds received packets into a SlidingBook.
+
+    Datagrams that arrive within one event-loop iteration are decoded and added as a single
+    batch. Completed and evicted pages are put on a bounded `queue`; timeouts are driven by
+    calling `book.expire()` every `expire_interval` seconds. When the queue is full, the
+    'drop' policy discards the page and counts it in `dropped_pages`, while the 'block'
+    policy pauses reading from the socket until the consumer catches up.
+    """
+    POLICIES = ('drop', 'block')
+
+    def __init__(self, book, queue: asyncio.Queue = None, policy: str = 'drop', expire_interval: float = None,
+                 maxsize: int = 1024):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Invalid queue policy {policy!r}, expected one of {self.POLICIES}.")
+        self.book = book
+        self.queue = asyncio.Queue(maxsize=maxsize) if queue is None else queue
+        self.policy = policy
+        self.expire_interval = book.timeout if expire_interval is None else expire_interval
+        self.transport = None
+        self.pending = []  # Datagrams received since the last flush
+        self.backlog = collections.deque()  # Pages waiting for room in the queue under the 'block' policy
+        self.received = 0
+        self.malformed = 0
+        self.dropped_pages = 0
+        self._flush_handle = None
+        self._expire_handle = None
+        self._drain_task = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+        self._expire_handle = asyncio.get_running_loop().call_later(self.expire_interval, self._expire)
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.pending.append(data)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _decode(self, datagrams: list) -> list:
+        """Decode the datagrams as one batch, or one by one if any is malformed or NumPy is missing."""
+        if optional_numpy() is not None:
+            sizes = [len(datagram) for datagram in datagrams]
+            try:
+                return PacketBatch.from_buffer(b''.join(datagrams), sizes=sizes)
+            except ValueError:
+                pass
+        packets = []
+        for datagram in datagrams:
+            if len(datagram) < HEADER_SIZE:
+                self.malformed += 1
+                continue
+            message_length = int.from_bytes(datagram[4:8], 'big')
+            if HEADER_SIZE + message_length > len(datagram) or message_length > Packet.MAX_MESSAGE_SIZE:
+                self.malformed += 1  # Truncated, or longer than any payload class
+                continue
+            packets.append(Packet.from_bytes(datagram))
+        return packets
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        datagrams, self.pending = self.pending, []
+        self.received += len(datagrams)
+        self._deliver(self.book.add_packets(self._decode(datagrams)))
+
+    def _expire(self) -> None:
+        self._deliver(self.book.expire())
+        self._expire_handle = asyncio.get_running_loop().call_later(self.expire_interval, self._expire)
+
+    def _deliver(self, pages: list) -> None:
+        for page in pages:
+            if self.backlog:
+                self.backlog.append(page)  # Keep pages in order behind the ones already waiting
+                continue
+            try:
+                self.queue.put_nowait(page)
+            except asyncio.QueueFull:
+                if self.policy == 'drop':
+                    self.dropped_pages += 1
+                else:
+                    self.backlog.append(page)
+        if self.backlog and self._drain_task is None:
+            self.transport.pause_reading()
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self.backlog:
+            await self.queue.put(self.backlog[0])
+            self.backlog.popleft()
+        self._drain_task = None
+        if not self.transport.is_closing():
+            self.transport.resume_reading()
+
+    def connection_lost(self, exc) -> None:
+        for handle in (self._flush_handle, self._expire_handle, self._drain_task):
+            if handle is not None:
+                handle.cancel()
+        self._flush_handle = self._expire_handle = self._drain_task = None
+
+    def __repr__(self):
+        return f"BookReceiver(policy={self.policy}, received={self.received}, malformed={self.malformed}, dropped_pages={self.dropped_pages}, queued={self.queue.qsize()})"
+
+
+async def open_receiver(book, local_addr: tuple, **kwargs):
+    """Bind a UDP socket feeding `book` and return the transport and its BookReceiver."""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: BookReceiver(book, **kwargs), local_addr=local_addr)
+
+
+async def send_packets(packets, remote_addr: tuple, yield_every: int = 64) -> int:
+    """Send packets as UDP datagrams in the Packet.to_bytes format and return how many were sent.
+
+    Packets are encoded `yield_every` at a time with one shared timestamp, and control is handed back to the event loop after each group so a receiver
+    running on the same loop keeps up.
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=remote_addr)
+    packets = iter(packets)
+    sent = 0
+    try:
+        while True:
+            group = list(itertools.islice(packets, yield_every))
+            if not group:
+                break
+            timestamp = time.time()
+            for packet in group:
+                transport.sendto(packet.to_bytes(timestamp))
+            sent += len(group)
+            await asyncio.sleep(0)
+    finally:
+        transport.close()
+    return sent
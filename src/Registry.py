@@ -0,0 +1,348 @@
+import multiprocessing
+import struct
+import time
+from multiprocessing import shared_memory
+from .Book import SlidingBook
+from .Packet import HEADER, HEADER_SIZE, Packet
+from .Page import Page
+
+
+class BookRegistry:
+    """Keep one SlidingBook per flow, created on the flow's first packet and retired when idle."""
+
+    def __init__(self, book_factory=SlidingBook, idle_timeout: float = None, clock=time.monotonic, **book_kwargs):
+        self.book_factory = book_factory
+        self.book_kwargs = book_kwargs  # Passed to book_factory for every new flow
+        self.idle_timeout = idle_timeout  # Books without packets for this long are retired by expire
+        self.clock = clock
+        self.books = {}
+        self.last_seen = {}
+
+    def get(self, flow_id) -> SlidingBook:
+        """Return the book of a flow, creating it on first use."""
+        book = self.books.get(flow_id)
+        if book is None:
+            book = self.books[flow_id] = self.book_factory(**self.book_kwargs)
+        return book
+
+    def add_packet(self, flow_id, packet: Packet) -> Page:
+        self.last_seen[flow_id] = self.clock()
+        return self.get(flow_id).add_packet(packet)
+
+    def add_packets(self, flow_id, packets, **kwargs) -> list:
+        self.last_seen[flow_id] = self.clock()
+        return self.get(flow_id).add_packets(packets, **kwargs)
+
+    def retire(self, flow_id) -> list:
+        """Drop a flow's book and return every page it still held, in page order.
+
+        Pages waiting in the book's `ready` queue and pages rebuilt from its stash are included.
+        """
+        book = self.books.pop(flow_id, None)
+        self.last_seen.pop(flow_id, None)
+        if book is None:
+            return []
+        pages = book.flush()
+        if getattr(book, 'budget', None) is not None:
+            book.budget.unregister(book)  # A shared MemoryBudget would otherwise keep the book alive
+        return pages
+
+    def expire(self, now: float = None) -> list:
+        """Expire stale pages of every flow and retire idle flows; return (flow_id, page) pairs."""
+        if now is None:
+            now = self.clock()
+        expired = []
+        for flow_id, book in self.books.items():
+            expired.extend((flow_id, page) for page in book.expire(now))
+        if self.idle_timeout is not None:
+            idle = [flow_id for flow_id, seen in self.last_seen.items() if seen + self.idle_timeout < now]
+            for flow_id in idle:
+                expired.extend((flow_id, page) for page in self.retire(flow_id))
+        return expired
+
+    def __len__(self):
+        return len(self.books)
+
+    def __contains__(self, flow_id):
+        return flow_id in self.books
+
+    def __repr__(self):
+        return f"BookRegistry(flows={len(self.books)}, idle_timeout={self.idle_timeout})"
+
+
+class SharedRing:
+    """Single-producer, single-consumer ring of length-prefixed records in shared memory.
+
+    The header holds three counters: `head` (bytes consumed), `tail` (bytes produced) and
+    `done` (the head position up to which the consumer has finished handling records).
+    """
+    HEADER = struct.Struct('QQQ')
+    LENGTH = struct.Struct('I')
+
+    def __init__(self, capacity: int = 1 << 22, name: str = None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER.size + capacity)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.capacity = capacity
+        self.buf = self.shm.buf
+
+    def __reduce__(self):
+        return (SharedRing, (self.capacity, self.shm.name))
+
+    def _counters(self):
+        return self.HEADER.unpack_from(self.buf, 0)
+
+    def _write(self, position: int, data) -> int:
+        start = self.HEADER.size + position % self.capacity
+        first = min(len(data), self.HEADER.size + self.capacity - start)
+        self.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.buf[self.HEADER.size:self.HEADER.size + len(data) - first] = data[first:]
+        return position + len(data)
+
+    def _read(self, position: int, size: int) -> bytes:
+        start = self.HEADER.size + position % self.capacity
+        first = min(size, self.HEADER.size + self.capacity - start)
+        data = bytes(self.buf[start:start + first])
+        if first < size:
+            data += bytes(self.buf[self.HEADER.size:self.HEADER.size + size - first])
+        return data
+
+    def put(self, *parts) -> bool:
+        """Append one record made of the given bytes-like parts; return False if it does not fit."""
+        size = sum(len(part) for part in parts)
+        head, tail, _ = self._counters()
+        if self.LENGTH.size + size > self.capacity - (tail - head):
+            if self.LENGTH.size + size > self.capacity:
+                raise ValueError(f"Record of {size} bytes exceeds the ring capacity of {self.capacity} bytes.")
+            return False
+        position = self._write(tail, self.LENGTH.pack(size))
+        for part in parts:
+            position = self._write(position, part)
+        struct.pack_into('Q', self.buf, 8, position)  # Publish the record only once it is written
+        return True
+
+    def get(self) -> bytes:
+        """Pop the oldest record, or return None if the ring is empty."""
+        head, tail, _ = self._counters()
+        if head == tail:
+            return None
+        size = self.LENGTH.unpack(self._read(head, self.LENGTH.size))[0]
+        record = self._read(head + self.LENGTH.size, size)
+        struct.pack_into('Q', self.buf, 0, head + self.LENGTH.size + size)
+        return record
+
+    def mark_done(self) -> None:
+        """Record that every record popped so far has been fully handled."""
+        struct.pack_into('Q', self.buf, 16, self._counters()[0])
+
+    def is_drained(self) -> bool:
+        """Whether every record put so far has been popped and handled."""
+        _, tail, done = self._counters()
+        return done == tail
+
+    def close(self, unlink: bool = False) -> None:
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+FLOW = struct.Struct('!Q')
+PAGE_HEADER = struct.Struct('!QqII')  # flow_id, min_SN (-1 if unset), page_size, packet count
+PACKET_HEADER = struct.Struct('!qdII')  # SN, timestamp, message length, MAC length
+
+
+def _encode_page(flow_id: int, page) -> list:
+    """Serialize a page into buffers for a ring record, keeping payloads as they are."""
+    packets = [packet for packet in page.packets if packet is not None]
+    parts = [PAGE_HEADER.pack(flow_id, -1 if page.min_SN is None else page.min_SN, page.page_size, len(packets))]
+    for packet in packets:
+        parts.append(PACKET_HEADER.pack(packet.SN, packet.timestamp, len(packet.message), len(packet.mac)))
+        parts.append(packet.message)
+        parts.append(packet.mac)
+    return parts
+
+
+def _decode_page(record: bytes):
+    flow_id, min_SN, page_size, count = PAGE_HEADER.unpack_from(record)
+    page = Page(page_size=page_size)
+    view = memoryview(record)
+    offset = PAGE_HEADER.size
+    for _ in range(count):
+        SN, timestamp, message_length, mac_length = PACKET_HEADER.unpack_from(record, offset)
+        offset += PACKET_HEADER.size
+        message = bytes(view[offset:offset + message_length])
+        offset += message_length
+        mac = bytes(view[offset:offset + mac_length])
+        offset += mac_length
+        page.add_packet(Packet(SN=SN, message=message, mac=mac, timestamp=timestamp))
+    if min_SN >= 0:
+        page.min_SN, page.max_SN = min_SN, min_SN + page_size
+    return flow_id, page
+
+
+def _decode_datagram(record: bytes):
+    """Return the flow ID and Packet of an inbox record, or None if the datagram is malformed."""
+    if len(record) < FLOW.size + HEADER_SIZE:
+        return None
+    flow_id = FLOW.unpack_from(record)[0]
+    if HEADER_SIZE + (HEADER.unpack_from(record, FLOW.size)[0] & 0xFFFFFFFF) > len(record) - FLOW.size:
+        return None  # Truncated: shorter than the message length it declares
+    try:
+        return flow_id, Packet.from_bytes(record[FLOW.size:])
+    except (ValueError, struct.error):
+        return None
+
+
+def _worker(inbox: SharedRing, outbox: SharedRing, stop, malformed, book_kwargs: dict, idle_timeout: float,
+            expire_interval: float) -> None:
+    """Worker process loop: feed datagrams from `inbox` into a BookRegistry, send pages to `outbox`.
+
+    Malformed datagrams are dropped and counted in the shared `malformed` value.
+    """
+    registry = BookRegistry(idle_timeout=idle_timeout, **book_kwargs)
+
+    def send(flow_id, page):
+        parts = _encode_page(flow_id, page)
+        while not outbox.put(*parts):
+            time.sleep(0.0001)  # Wait for the parent to drain completed pages
+
+    next_expire = time.monotonic() + expire_interval
+    idle_sleep = 0.0001
+    while True:
+        handled = 0
+        while handled < 1024:
+            record = inbox.get()
+            if record is None:
+                break
+            handled += 1
+            decoded = _decode_datagram(record)
+            if decoded is None:
+                malformed.value += 1
+                continue
+            flow_id, packet = decoded
+            page = registry.add_packet(flow_id, packet)
+            if page is not None:
+                send(flow_id, page)
+        inbox.mark_done()
+
+        now = time.monotonic()
+        if now >= next_expire:
+            for flow_id, page in registry.expire(now):
+                send(flow_id, page)
+            next_expire = now + expire_interval
+        if handled == 0:
+            if stop.is_set() and inbox.is_drained():
+                break
+            time.sleep(idle_sleep)
+
+    for flow_id in list(registry.books):
+        for page in registry.retire(flow_id):
+            send(flow_id, page)
+    inbox.close()
+    outbox.close()
+
+
+class ShardedBookRegistry:
+    """Spread flows over worker processes, each running its own BookRegistry.
+
+    Flows are assigned to workers by a hash of their integer flow ID. Datagrams travel to the
+    workers and completed or evicted pages travel back through shared-memory rings, so no Page
+    object is ever pickled. Flow IDs must be integers in [0, 2**64).
+    """
+
+    def __init__(self, num_workers: int = None, ring_size: int = 1 << 22, idle_timeout: float = None,
+                 expire_interval: float = None, **book_kwargs):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        timeout = book_kwargs.get('timeout', 0.001)
+        self.inboxes = [SharedRing(ring_size) for _ in range(self.num_workers)]
+        self.outboxes = [SharedRing(ring_size) for _ in range(self.num_workers)]
+        self.stop = multiprocessing.Event()
+        # Malformed datagrams dropped by each worker; each value has a single writer, so no lock
+        self.malformed_counts = [multiprocessing.Value('Q', 0, lock=False) for _ in range(self.num_workers)]
+        self.workers = [
+            multiprocessing.Process(target=_worker, daemon=True,
+                                    args=(inbox, outbox, self.stop, malformed, book_kwargs, idle_timeout,
+                                          timeout if expire_interval is None else expire_interval))
+            for inbox, outbox, malformed in zip(self.inboxes, self.outboxes, self.malformed_counts)]
+        for worker in self.workers:
+            worker.start()
+        self.ready = []  # Pages pulled from the rings but not yet returned by poll
+        self.closed = False
+
+    def shard(self, flow_id: int) -> int:
+        """Worker index that owns a flow; Fibonacci hashing spreads sequential IDs evenly."""
+        return (((flow_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % self.num_workers
+
+    @property
+    def malformed(self) -> int:
+        """Datagrams the workers dropped because they could not be decoded."""
+        return sum(count.value for count in self.malformed_counts)
+
+    def _check_workers(self) -> None:
+        """Raise if a worker exited before close(), since its ring would never be drained again."""
+        if self.stop.is_set():
+            return
+        for index, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                raise RuntimeError(f"Worker {index} exited unexpectedly with code {worker.exitcode}.")
+
+    def submit(self, flow_id: int, datagram) -> None:
+        """Route one encoded packet to the worker owning its flow, waiting while its ring is full."""
+        inbox = self.inboxes[self.shard(flow_id)]
+        header = FLOW.pack(flow_id)
+        while not inbox.put(header, datagram):
+            self._collect()  # Keep workers from blocking on a full outbox while we wait
+            time.sleep(0.0001)
+
+    def _collect(self) -> None:
+        self._check_workers()
+        for outbox in self.outboxes:
+            record = outbox.get()
+            while record is not None:
+                self.ready.append(_decode_page(record))
+                record = outbox.get()
+
+    def poll(self) -> list:
+        """Return the (flow_id, page) pairs completed or evicted since the last call."""
+        self._collect()
+        ready, self.ready = self.ready, []
+        return ready
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Wait until the workers have handled every submitted datagram."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(inbox.is_drained() for inbox in self.inboxes):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            self._collect()
+            time.sleep(0.0005)
+        return True
+
+    def close(self) -> list:
+        """Stop the workers and return every page still pending, including the partially filled ones."""
+        if self.closed:
+            return []
+        self.closed = True
+        self.stop.set()
+        while any(worker.is_alive() for worker in self.workers):
+            self._collect()
+            time.sleep(0.0005)
+        for worker in self.workers:
+            worker.join()
+        remaining = self.poll()
+        for ring in self.inboxes + self.outboxes:
+            ring.close(unlink=True)
+        return remaining
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"ShardedBookRegistry(num_workers={self.num_workers})"
@@ -0,0 +1,57 @@
+import os
+import socket
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+class PageSink:
+    """Stream the messages of completed pages to a file descriptor, file or socket.
+
+    The messages are handed to the kernel as a list of buffers with `os.writev` (or
+    `socket.sendmsg` for sockets), so reassembled data leaves the process without being
+    concatenated first. `fill_size` zero-fills missing slots instead of skipping them.
+    """
+
+    def __init__(self, target, fill_size: int = None):
+        self.target = target
+        self.fill_size = fill_size
+        self.bytes_written = 0
+        if isinstance(target, socket.socket):
+            self._send = target.sendmsg
+        else:
+            fd = target if isinstance(target, int) else target.fileno()
+            self._send = lambda buffers: os.writev(fd, buffers)
+
+    def _write_buffers(self, buffers: list) -> int:
+        """Write every buffer, resuming after partial writes, and return the bytes written."""
+        total = 0
+        buffers = [memoryview(buffer).cast('B') for buffer in buffers if len(buffer)]
+        first = 0
+        while first < len(buffers):
+            written = self._send(buffers[first:first + IOV_MAX])
+            total += written
+            # Skip the buffers that went out completely and trim the one written in part
+            while first < len(buffers) and written >= len(buffers[first]):
+                written -= len(buffers[first])
+                first += 1
+            if written:
+                buffers[first] = buffers[first][written:]
+        self.bytes_written += total
+        return total
+
+    def write(self, page) -> int:
+        """Write one page's messages in SN order and return the bytes written."""
+        return self._write_buffers(page.buffers(self.fill_size))
+
+    def write_pages(self, pages) -> int:
+        """Write several pages with as few system calls as possible."""
+        buffers = []
+        for page in pages:
+            buffers.extend(page.buffers(self.fill_size))
+        return self._write_buffers(buffers)
+
+    def __repr__(self):
+        return f"PageSink(target={self.target}, fill_size={self.fill_size}, bytes_written={self.bytes_written})"
@@ -0,0 +1,148 @@
+import mmap
+import os
+import struct
+from .ColumnarPage import ColumnarPage
+from .Packet import Packet
+
+
+class SpillStore:
+    """File-backed storage for ColumnarPage slots, so very large windows live in the page cache.
+
+    The file holds a small header followed by `num_slots` fixed-size page slots, each laid out
+    exactly like a ColumnarPage buffer (columns, then payload slots). Only the page objects and
+    the free-slot list are kept in RAM; cold slots are paged out by the kernel and exported pages
+    are views straight into the mapping. Pass the store as `page_factory` to SlidingBook.
+
+    Because the columns are stored in the file, reopening it after a restart finds every page
+    that was still buffered, or handed out and not yet released: see `recovered` and
+    SlidingBook.restore.
+
+    A book takes num_pages slots when it is created (its preallocated free list) and one more
+    for every page it hands out beyond that. Consumers must pass handed-out pages back with
+    SlidingBook.release_page (or the store's release) to free their slots. When every slot is
+    in use the store hands out in-memory pages of the same layout instead of failing; they are
+    counted in `overflow_pages` and are not recovered after a restart.
+    """
+    MAGIC = b'BOOKSPIL'
+    VERSION = 3  # 2: presence stored as a bitmap, 3: filled-slot bitmap after it
+    # magic, version, num_slots, page_size, payload_size, mac_size, checkpointed global_min_SN
+    HEADER = struct.Struct('<8sIIIIIq')
+    HEADER_SIZE = 64
+    ALIGNMENT = 64  # Slots start on a cache line
+
+    def __init__(self, path, num_slots: int, page_size: int,
+                 payload_size: int = max(Packet.ALLOWED_PAYLOAD_SIZES), mac_size: int = ColumnarPage.MAX_MAC_SIZE):
+        self.path = path
+        self.num_slots = num_slots
+        self.page_size = page_size
+        self.payload_size = payload_size
+        self.mac_size = mac_size
+        nbytes = ColumnarPage.nbytes(page_size, payload_size, mac_size)
+        self.slot_size = (nbytes + self.ALIGNMENT - 1) & ~(self.ALIGNMENT - 1)
+        size = self.HEADER_SIZE + num_slots * self.slot_size
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            if existing not in (0, size):
+                raise ValueError(f"{path} holds {existing} bytes, expected {size} for this layout.")
+            if existing == 0:
+                os.ftruncate(fd, size)
+            self.mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)  # The mapping keeps the file open
+
+        self.global_min_SN = 0
+        if existing:
+            magic, version, *layout, self.global_min_SN = self.HEADER.unpack_from(self.mmap, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f"{path} is not a spill store file.")
+            if layout != [num_slots, page_size, payload_size, mac_size]:
+                raise ValueError(f"{path} was created with a different layout {layout}.")
+        else:
+            self._write_header()
+
+        view = memoryview(self.mmap)
+        self.pages = [ColumnarPage(page_size, payload_size, mac_size,
+                                   buffer=view[self._offset(slot):self._offset(slot) + nbytes])
+                      for slot in range(num_slots)]
+        self.slot_of = {id(page): slot for slot, page in enumerate(self.pages)}
+        self.overflow_pages = 0  # Pages handed out in memory because every slot was in use
+
+        # Slots that still hold packets are pages the book buffered, or handed out and that
+        # were not released, before the file was closed
+        self.recovered = []
+        self.free_slots = []
+        for slot in reversed(range(num_slots)):
+            page = self.pages[slot]
+            page.reload()
+            if page.occupancy:
+                self.recovered.append(page)
+            else:
+                self.free_slots.append(slot)
+        self.recovered.sort(key=lambda page: page.min_SN)
+
+    def _offset(self, slot: int) -> int:
+        return self.HEADER_SIZE + slot * self.slot_size
+
+    def _write_header(self) -> None:
+        self.HEADER.pack_into(self.mmap, 0, self.MAGIC, self.VERSION, self.num_slots, self.page_size,
+                              self.payload_size, self.mac_size, self.global_min_SN)
+
+    def __call__(self, page_size: int) -> ColumnarPage:
+        """Hand out the page of a free slot; this is the page_factory interface of SlidingBook.
+
+        With every slot in use, returns an in-memory ColumnarPage of the same layout instead.
+        """
+        if page_size != self.page_size:
+            raise ValueError(f"Store slots hold pages of {self.page_size} packets, not {page_size}.")
+        if not self.free_slots:
+            self.overflow_pages += 1
+            return ColumnarPage(page_size, self.payload_size, self.mac_size)
+        page = self.pages[self.free_slots.pop()]
+        page.clear()
+        return page
+
+    def owns(self, page: ColumnarPage) -> bool:
+        """Return True if the page is backed by a slot of the file, not an in-memory overflow page."""
+        return id(page) in self.slot_of
+
+    def release(self, page: ColumnarPage) -> None:
+        """Return a page's slot to the store; the page must not be used afterwards."""
+        page.clear()  # Clears presence in the file, so the slot is not recovered
+        slot = self.slot_of.get(id(page))
+        if slot is not None:  # In-memory overflow pages have no slot and are dropped
+            self.free_slots.append(slot)
+
+    def checkpoint(self, book) -> None:
+        """Record the book's window position and flush the mapping to disk."""
+        self.global_min_SN = book.global_min_SN
+        self._write_header()
+        self.mmap.flush()
+
+    def flush(self) -> None:
+        self.mmap.flush()
+
+    def close(self) -> None:
+        """Flush and unmap the file. Views still held by the caller keep the mapping alive."""
+        self.mmap.flush()
+        self.pages = []
+        self.recovered = []
+        self.slot_of = {}
+        try:
+            self.mmap.close()
+        except BufferError:
+            pass  # Unmapped once the last exported page view is gone
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.num_slots - len(self.free_slots)
+
+    def __repr__(self):
+        return (f"SpillStore(path={self.path!r}, num_slots={self.num_slots}, page_size={self.page_size}, used={len(self)}, "
+                f"overflow_pages={self.overflow_pages})")
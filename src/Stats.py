@@ -0,0 +1,88 @@
+class BookStats:
+    """Counters and histograms describing what a SlidingBook did with its packets.
+
+    Every event is a plain integer increment, so the stats stay on in the hot path. Histograms
+    have log2 buckets: bucket b counts values v with int(v).bit_length() == b, i.e. bucket 0 holds
+    0 and bucket b >= 1 holds [2**(b-1), 2**b). Fill times are in microseconds, from a page's
+    first to its last packet; reorder distances count how many SNs a packet arrived behind the
+    highest SN accepted before it, 0 meaning in order. `hook`, if set, is called as
+    hook(event, value) with the SN for packet events and the Page for page events.
+
+    Every packet is counted once on arrival, as accepted, duplicate, below_window, above_window,
+    rejected or stashed, so those counters add up to the packets received. Stashed packets are later
+    resolved as stash_hits (added to their page) or stash_misses.
+    """
+    BUCKETS = 48
+    EVENTS = ('accepted', 'duplicate', 'below_window', 'above_window', 'rejected', 'evicted_incomplete', 'completed_full')
+    STASH_EVENTS = ('stashed', 'stash_hits', 'stash_misses', 'stash_overflows')
+    BUDGET_EVENTS = ('budget_evictions',)
+    PARITY_EVENTS = ('parity_recovered', 'parity_late')
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.accepted = 0
+        self.duplicate = 0  # Includes late packets of pages that were already completed or evicted
+        self.below_window = 0
+        self.above_window = 0
+        self.rejected = 0  # Packets their page cannot hold, e.g. a MAC longer than a ColumnarPage's mac_size
+        self.evicted_incomplete = 0
+        self.completed_full = 0
+        # Above-window packets kept in the stash; when drained they are added to their page
+        # (hits) or rejected as duplicates or for a page already gone (misses). Packets not
+        # kept because the stash was full count as above_window and as overflows
+        self.stashed = 0
+        self.stash_hits = 0
+        self.stash_misses = 0
+        self.stash_overflows = 0
+        self.budget_evictions = 0  # Pages evicted to keep a shared MemoryBudget
+        self.parity_recovered = 0  # Data packets rebuilt from repair packets by a ParityCodec
+        self.parity_late = 0  # Repair packets arriving after their page left, not counted as late data
+        self.fill_time_us = [0] * self.BUCKETS
+        self.reorder_distance = [0] * self.BUCKETS
+        self.max_SN = -1  # Highest SN accepted so far
+
+    def record_reorder(self, SN: int) -> None:
+        """Record the reorder distance of one accepted packet."""
+        if SN > self.max_SN:
+            self.max_SN = SN
+            self.reorder_distance[0] += 1
+        else:
+            self.reorder_distance[min((self.max_SN - SN).bit_length(), self.BUCKETS - 1)] += 1
+
+    def record_reorders(self, SNs) -> None:
+        """Vectorized record_reorder for the accepted packets of a batch (a NumPy array), in arrival order."""
+        if len(SNs) == 0:
+            return
+        import numpy as np  # Only batch callers, which already use NumPy, get here
+        highest_before = np.maximum.accumulate(np.concatenate(([self.max_SN], SNs)))[:-1]
+        distances = np.maximum(highest_before - SNs, 0)
+        buckets = np.minimum(np.frexp(distances.astype(np.float64))[1], self.BUCKETS - 1)
+        for bucket, count in enumerate(np.bincount(buckets, minlength=self.BUCKETS).tolist()):
+            self.reorder_distance[bucket] += count
+        self.max_SN = max(self.max_SN, int(SNs.max()))
+
+    def record_page(self, page, fill_time: float) -> None:
+        """Count a page leaving the book, completed or not, and how long it took to fill."""
+        if page.is_full():
+            self.completed_full += 1
+            event = 'completed_full'
+        else:
+            self.evicted_incomplete += 1
+            event = 'evicted_incomplete'
+        self.fill_time_us[min(int(max(fill_time, 0) * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        if self.hook is not None:
+            self.hook(event, page)
+
+    def snapshot(self) -> dict:
+        """Copy of the counters and histograms."""
+        snapshot = {event: getattr(self, event) for event in self.EVENTS + self.STASH_EVENTS + self.BUDGET_EVENTS
+                    + self.PARITY_EVENTS}
+        snapshot['fill_time_us'] = list(self.fill_time_us)
+        snapshot['reorder_distance'] = list(self.reorder_distance)
+        return snapshot
+
+    def reset(self) -> None:
+        self.__init__(hook=self.hook)
+
+    def __repr__(self):
+        return "BookStats(" + ", ".join(f"{event}={getattr(self, event)}" for event in self.EVENTS) + ")"
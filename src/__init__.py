@@ -1,7 +1,45 @@
 # src/__init__.py
 
 from .Page import Page
-from .Packet import Packet
+from .Packet import Packet, PacketBatch, PacketPool
 from .Book import SlidingBook
+from .Adaptive import AdaptiveTuner
+from .Stats import BookStats
 
-__all__ = ['Page', 'Packet', 'SlidingBook']
\ No newline at end of file
+# Everything else is imported on first access (PEP 562), so that `import src` stays cheap for
+# short-lived workers: NumPy, asyncio, multiprocessing and the thread pool are only loaded when used
+_LAZY = {
+    'ColumnarPage': '.ColumnarPage',
+    'PageVerifier': '.Verifier',
+    'PageSink': '.Sink',
+    'SpillStore': '.SpillStore',
+    'MemoryBudget': '.Budget',
+    'ParityCodec': '.Parity',
+    'CaptureReader': '.Capture',
+    'CaptureWriter': '.Capture',
+    'ReplayClock': '.Capture',
+    'BookRegistry': '.Registry',
+    'ShardedBookRegistry': '.Registry',
+    'SharedRing': '.Registry',
+    'BookReceiver': '.Receiver',
+    'open_receiver': '.Receiver',
+    'send_packets': '.Receiver',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # Later lookups skip this function
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+# Only the eager names: listing the lazy ones would make `from src import *` load all of them
+__all__ = ['Page', 'Packet', 'SlidingBook', 'AdaptiveTuner', 'PacketBatch', 'PacketPool', 'BookStats']
@@ -0,0 +1,52 @@
+import unittest
+from src import AdaptiveTuner, Packet, SlidingBook
+
+class TestAdaptiveTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.book = SlidingBook(num_pages=4, page_size=8, timeout=0.01, clock=lambda: self.now[0])
+
+    def feed(self, SNs, gap=0.001):
+        for SN in SNs:
+            self.now[0] += gap
+            self.book.add_packet(Packet(SN=SN, message=b'x'))
+
+    def test_memory_objective_fits_reordering(self):
+        # Test that the window shrinks to the observed reorder distance and the timeout to its arrival time
+        tuner = AdaptiveTuner(self.book, objective='memory', interval=0.1, min_samples=64, quantile=0.9)
+        # Swap neighbours: every other packet arrives one SN behind the highest seen
+        self.feed(SN + offset for SN in range(0, 256, 2) for offset in (1, 0))
+        self.assertTrue(tuner.update())
+
+        params = tuner.params()
+        self.assertEqual(params['reorder_distance'], 1)
+        self.assertEqual(params['num_pages'], 2)  # Clamped to min_pages
+        self.assertAlmostEqual(params['interarrival'], 0.001)
+        self.assertAlmostEqual(params['timeout'], 0.002)
+
+    def test_drop_rate_objective_grows_window(self):
+        # Test that drops above the target double the window and timeout
+        tuner = AdaptiveTuner(self.book, target_drop_rate=0.01, interval=0.1, min_samples=64)
+        self.feed(range(100, 132))  # Above the 32-SN window: all dropped
+        self.feed(range(0, 32))
+        self.feed(range(32, 96))
+        self.assertTrue(tuner.update())
+        self.assertEqual((self.book.num_pages, self.book.timeout), (8, 0.02))
+        self.assertGreater(tuner.drop_rate, 0.01)
+
+    def test_waits_for_interval_and_samples(self):
+        # Test that nothing changes before an interval with enough packets has passed
+        tuner = AdaptiveTuner(self.book, interval=0.1, min_samples=64)
+        self.feed(range(10))
+        self.assertFalse(tuner.update())
+        self.now[0] = 1.0
+        self.assertFalse(tuner.update())  # Only 10 packets
+        self.assertEqual(self.book.num_pages, 4)
+
+    def test_invalid_objective(self):
+        with self.assertRaises(ValueError):
+            AdaptiveTuner(self.book, objective='latency')
+
+if __name__ == '__main__':
+    unittest.main()
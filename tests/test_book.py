@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from src import *
 
 
@@ -93,5 +94,272 @@ class TestSlidingBook(unittest.TestCase):
         self.assertEqual(book.global_min_SN, 0)
         self.assertEqual(book.global_max_SN, 50)
 
+        # The default NACK range follows the packets received since the reset
+        book.add_packet(Packet(SN=2, message=b'message3'))
+        self.assertEqual(book.missing_ranges(), [(0, 2)])
+
+    def test_add_packets_matches_add_packet(self):
+        # Test that a batch gives the same pages as adding the packets one by one
+        SNs = [0, 1, 1, 3, 2, 5, 40, 4, 7, 6, 9, 8, 0, 12, 10, 11, 13, 14]
+        packets = [Packet(SN=sn, message=bytes([sn]), mac=b'mac') for sn in SNs]
+
+        loop_book = SlidingBook(num_pages=2, page_size=5, timeout=60)
+        expected = [page for page in map(loop_book.add_packet, packets) if page is not None]
+
+        batch_book = SlidingBook(num_pages=2, page_size=5, timeout=60)
+        completed = batch_book.add_packets(packets)
+
+        self.assertEqual(len(completed), len(expected))
+        for page, expected_page in zip(completed, expected):
+            self.assertEqual([p.SN for p in page.packets], [p.SN for p in expected_page.packets])
+            self.assertEqual(list(page.packets), list(expected_page.packets))
+        self.assertEqual(batch_book.global_min_SN, loop_book.global_min_SN)
+        self.assertEqual(sorted(batch_book.pages), sorted(loop_book.pages))
+
+    def test_add_packets_from_arrays(self):
+        # Test adding a batch given as an array of SNs plus payloads
+        book = SlidingBook(num_pages=2, page_size=2)
+        SNs = np.array([1, 0, 3, 2, 9])
+        payloads = [b'b', b'a', b'd', b'c', b'z']
+        completed = book.add_packets(SNs, payloads, macs=[b'm'] * 5)
+
+        self.assertEqual(len(completed), 2)
+        self.assertEqual([p.message for p in completed[0].packets], [b'a', b'b'])
+        self.assertEqual([p.message for p in completed[1].packets], [b'c', b'd'])
+        self.assertEqual(completed[1].packets[0].mac, b'm')
+        self.assertEqual(book.global_min_SN, 4)
+        self.assertEqual(book.add_packets([]), [])
+
+    def test_add_packets_from_batch(self):
+        # Test feeding a decoded PacketBatch straight into the book
+        packets = [Packet(SN=sn, message=bytes([65 + sn]), mac=b'') for sn in [1, 0, 2]]
+        batch = PacketBatch.from_buffer(b''.join(packet.to_bytes() for packet in packets), mac_size=0)
+        book = SlidingBook(num_pages=2, page_size=2)
+        completed = book.add_packets(batch)
+
+        self.assertEqual(len(completed), 1)
+        self.assertEqual([p.message for p in completed[0].packets], [b'A', b'B'])
+        self.assertIsInstance(book.pages[1].packets[0].message, bytes)
+
+    def test_out_of_order_completion_slides_window(self):
+        # Test that pages completed ahead of the head are skipped once the head retires
+        book = SlidingBook(num_pages=3, page_size=2)
+        book.add_packet(Packet(SN=0, message=b'a'))
+        self.assertIsNotNone(book.add_packets([Packet(SN=2, message=b'c'), Packet(SN=3, message=b'd')])[0])
+        book.add_packet(Packet(SN=5, message=b'f'))
+        self.assertIsNotNone(book.add_packet(Packet(SN=4, message=b'e')))
+        self.assertEqual(book.global_min_SN, 0)  # The head page is still incomplete
+
+        # A late duplicate of a retired page is dropped instead of opening a new page
+        self.assertIsNone(book.add_packet(Packet(SN=2, message=b'c')))
+        self.assertEqual(list(book.pages), [0])
+
+        head = book.add_packet(Packet(SN=1, message=b'b'))
+        self.assertEqual([p.SN for p in head.packets], [0, 1])
+        self.assertEqual(book.global_min_SN, 6)
+        self.assertEqual(book.global_max_SN, 12)
+        self.assertEqual(len(book.pages), 0)
+
+    def test_release_page_reuses_slots(self):
+        # Test that a released page is cleared and reused for a later page
+        book = SlidingBook(num_pages=2, page_size=1)
+        page = book.add_packet(Packet(SN=0, message=b'a'))
+        book.release_page(page)
+
+        self.assertIsNone(page.min_SN)
+        self.assertEqual(page.occupancy, 0)
+        self.assertIs(book.add_packet(Packet(SN=1, message=b'b')), page)
+
+    def test_release_page_guards(self):
+        # Test that releasing a page twice, or one the book still holds, is refused
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60)
+        page = book.add_packets([0, 1], [b'a', b'b'])[0]
+        book.release_page(page)
+        with self.assertRaises(ValueError):
+            book.release_page(page)
+        self.assertEqual(len(book.free_pages), 2)
+
+        book.add_packet(Packet(SN=2, message=b'c'))
+        with self.assertRaises(ValueError):
+            book.release_page(book.pages[1])
+        self.assertEqual(book.pages[1].occupancy, 1)
+
+        # Once handed out again the page can be released again
+        page = book.add_packet(Packet(SN=3, message=b'd'))
+        book.release_page(page)
+
+    def test_expire_stale_pages(self):
+        # Test that expire returns every page past its deadline in one call
+        now = [0.0]
+        book = SlidingBook(num_pages=4, page_size=2, timeout=1.0, clock=lambda: now[0])
+        book.add_packet(Packet(SN=0, message=b'a'))
+        book.add_packet(Packet(SN=4, message=b'e'))
+        now[0] = 0.5
+        book.add_packet(Packet(SN=6, message=b'g'))
+
+        self.assertEqual(book.expire(1.0), [])
+        now[0] = 1.2
+        expired = book.expire()
+        self.assertEqual([page.min_SN for page in expired], [0, 4])
+        self.assertEqual(book.global_min_SN, 2)  # Only the head page slides the window
+
+        # Page 3 was refreshed at 0.5, so it expires later
+        self.assertEqual([page.min_SN for page in book.expire(1.6)], [6])
+        self.assertEqual(len(book.pages), 0)
+
+    def test_expire_skips_missing_head(self):
+        # Test that a head page that never arrived does not hold the window forever
+        book = SlidingBook(num_pages=3, page_size=2, timeout=1.0, clock=lambda: 0.0)
+        book.add_packet(Packet(SN=2, message=b'c'))
+        book.add_packet(Packet(SN=3, message=b'd'))
+        self.assertEqual(book.global_min_SN, 0)
+
+        self.assertEqual(book.expire(0.5), [])
+        self.assertEqual(book.expire(2.0), [])
+        self.assertEqual(book.global_min_SN, 4)
+        self.assertEqual(book.global_max_SN, 10)
+
+    def test_missing_ranges(self):
+        # Test the NACK report across the window, merging ranges that span pages
+        book = SlidingBook(num_pages=4, page_size=3, timeout=60)
+        for SN in [0, 2, 6, 7, 8, 11]:
+            book.add_packet(Packet(SN=SN, message=b'x'))
+
+        # Page 2 completed ahead of the head and counts as received
+        self.assertEqual(book.bitmap(), 0b100111000101)
+        self.assertEqual(book.missing_ranges(), [(1, 2), (3, 6), (9, 11)])
+        self.assertEqual(book.missing_ranges(stop_SN=4), [(1, 2), (3, 4)])
+
+    def test_packet_pool_recycles_released_pages(self):
+        # Test that releasing a page returns its packets to the book's pool for the next batch
+        pool = PacketPool()
+        book = SlidingBook(num_pages=2, page_size=2, packet_pool=pool)
+        page = book.add_packets([0, 1], [b'a', b'b'])[0]
+        packets = list(page.packets)
+        book.release_page(page)
+
+        self.assertEqual(len(pool), 2)
+        page = book.add_packets([3, 2], [b'd', b'c'])[0]
+        self.assertEqual({id(p) for p in page.packets}, {id(p) for p in packets})
+        self.assertEqual([p.message for p in page.packets], [b'c', b'd'])
+
+    def test_stash_drains_early_packets(self):
+        # Test that packets ahead of the window are kept and land in their page once it opens
+        overhead = SlidingBook.STASH_PACKET_OVERHEAD
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, stash_bytes=3 * (1 + overhead))
+        for SN in [4, 5, 6]:
+            self.assertIsNone(book.add_packet(Packet(SN=SN, message=b'x')))
+        self.assertIsNone(book.add_packet(Packet(SN=7, message=b'xy')))  # Does not fit
+
+        book.add_packet(Packet(SN=0, message=b'a'))
+        page = book.add_packet(Packet(SN=1, message=b'b'))
+        self.assertEqual([p.SN for p in page.packets], [0, 1])
+        # Page 2 was completed from the stash while the window slid
+        page = book.add_packet(Packet(SN=5, message=b'x'))  # Duplicate
+        self.assertEqual([p.SN for p in page.packets], [4, 5])
+        self.assertEqual(book.global_min_SN, 2)
+        self.assertEqual(list(book.stash), [3])  # SN 6 waits for page 3 to enter the window
+
+        stats = book.stats()
+        self.assertEqual((stats['stash_hits'], stats['stash_misses'], stats['stash_overflows']), (2, 0, 1))
+        self.assertEqual((stats['stashed'], stats['above_window']), (3, 1))  # SN 7 was dropped
+        self.assertEqual(stats['stash_size'], 1 + overhead)
+        # Every packet is counted exactly once on arrival
+        self.assertEqual(sum(stats[event] for event in ('accepted', 'duplicate', 'below_window', 'above_window', 'stashed')), 7)
+
+    def test_stash_bounds(self):
+        # Test that empty packets still use up the stash and that far-off packets are not stashed
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, stash_bytes=10 * SlidingBook.STASH_PACKET_OVERHEAD)
+        for SN in range(4, 1000):
+            book.add_packet(Packet(SN=SN, message=b''))
+        stats = book.stats()
+        self.assertEqual((stats['stashed'], stats['stash_overflows']), (4, 0))  # Only pages 2 and 3 are near enough
+        self.assertEqual(stats['above_window'], 992)
+        self.assertEqual(sorted(book.stash), [2, 3])
+
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, stash_bytes=2 * SlidingBook.STASH_PACKET_OVERHEAD)
+        for SN in [4, 5, 6]:
+            book.add_packet(Packet(SN=SN, message=b''))
+        self.assertEqual((book.metrics.stashed, book.metrics.stash_overflows), (2, 1))
+        self.assertEqual(book.stash_size, 2 * SlidingBook.STASH_PACKET_OVERHEAD)
+
+    def test_stash_batch_matches_loop(self):
+        # Test that a batch with early packets completes the same pages as a loop
+        SNs = [2, 3, 6, 0, 6, 7, 1, 4, 3, 5]
+        loop_book = SlidingBook(num_pages=1, page_size=2, timeout=60, clock=lambda: 0.0, stash_bytes=1024, stash_pages=4)
+        loop = [loop_book.add_packet(Packet(SN=SN, message=b'x')) for SN in SNs]
+        loop = [[p.SN for p in page.packets] for page in loop if page is not None]
+        batch_book = SlidingBook(num_pages=1, page_size=2, timeout=60, clock=lambda: 0.0, stash_bytes=1024, stash_pages=4)
+        batch = batch_book.add_packets(SNs, [memoryview(b'x')] * len(SNs))
+
+        self.assertEqual([[p.SN for p in page.packets] for page in batch], [[0, 1], [2, 3], [4, 5], [6, 7]])
+        self.assertEqual(loop, [[0, 1], [2, 3], [4, 5]])  # The last page is still waiting in ready
+        self.assertEqual([[p.SN for p in page.packets] for page in loop_book.drain_ready()], [[6, 7]])
+        self.assertEqual(loop_book.drain_ready(), [])
+        self.assertEqual(batch_book.stats()['stash_misses'], 1)  # The second SN 6
+        self.assertEqual(batch_book.stats()['below_window'], 1)  # The second SN 3
+        # Counters and histograms, reorder distances included, match the loop exactly (one clock for both)
+        self.assertEqual(batch_book.stats(), loop_book.stats())
+
+        SNs = [0, 1, 2, 3, 20, 4, 5, 6, 7]
+        loop_book = SlidingBook(num_pages=4, page_size=2, timeout=60, clock=lambda: 0.0, stash_bytes=1024, stash_pages=8)
+        for SN in SNs:
+            loop_book.add_packet(Packet(SN=SN, message=b'x'))
+        batch_book = SlidingBook(num_pages=4, page_size=2, timeout=60, clock=lambda: 0.0, stash_bytes=1024, stash_pages=8)
+        batch_book.add_packets(SNs, [b'x'] * len(SNs))
+        self.assertEqual(batch_book.stats()['reorder_distance'], loop_book.stats()['reorder_distance'])
+        self.assertEqual(batch_book.stats(), loop_book.stats())
+
+    def test_resize_keeps_buffered_pages(self):
+        # Test that resizing moves pages to their new slots and never drops buffered pages
+        book = SlidingBook(num_pages=4, page_size=2, timeout=60)
+        for SN in [1, 4, 5, 6]:
+            book.add_packet(Packet(SN=SN, message=b'x'))  # Page 2 completes ahead of the head
+
+        self.assertEqual(book.resize(2), 4)  # Page 3 is still buffered
+        self.assertEqual(book.resize(8), 8)
+        self.assertEqual(book.global_max_SN, 16)
+        self.assertEqual(sorted(book.pages), [0, 3])
+        book.add_packet(Packet(SN=14, message=b'x'))  # Inside the grown window
+        page = book.add_packet(Packet(SN=0, message=b'x'))
+        self.assertEqual([p.SN for p in page.packets], [0, 1])
+        self.assertEqual(book.global_min_SN, 2)  # Page 1 is still missing
+        self.assertTrue(book.retired[2])
+
+    def test_set_timeout_reschedules_deadlines(self):
+        # Test that lowering the timeout makes pending pages expire on the new deadline
+        now = [0.0]
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, clock=lambda: now[0])
+        book.add_packet(Packet(SN=0, message=b'x'))
+        book.set_timeout(1.0)
+        self.assertEqual(len(book.expire(2.0)), 1)
+
+    def test_stream_yields_pages_in_order(self):
+        # Test that pages completed ahead of the head wait until the pages before them are out
+        book = SlidingBook(num_pages=3, page_size=2, timeout=60)
+        source = [Packet(SN=SN, message=b'x') for SN in [4, 5, 2, 3]] + [Packet(SN=0, message=b'x').to_bytes()]
+        pages = book.stream(source)
+        page = next(pages)  # Page 0 is evicted partial at the end of the source
+        self.assertEqual((page.min_SN, page.occupancy), (0, 1))
+        self.assertEqual([page.min_SN for page in pages], [2, 4])
+
+    def test_stream_yields_gaps_as_empty_pages(self):
+        # Test that a page that never arrived is yielded empty once the window skips it
+        now = [0.0]
+        book = SlidingBook(num_pages=3, page_size=2, timeout=1.0, clock=lambda: now[0])
+
+        def source():
+            yield Packet(SN=2, message=b'x')
+            now[0] = 5.0
+            yield Packet(SN=3, message=b'x')  # Completes page 1 long after page 0 went missing
+            for SN in range(4, 1000):
+                yield Packet(SN=SN, message=b'x')
+
+        pages = book.stream(source(), expire_every=1)
+        page = next(pages)
+        self.assertEqual((page.min_SN, page.occupancy, page.is_full()), (0, 0, False))
+        self.assertEqual([next(pages).min_SN for _ in range(3)], [2, 4, 6])
+        self.assertLessEqual(len(book.pages), book.num_pages)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
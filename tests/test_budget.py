@@ -0,0 +1,109 @@
+import unittest
+from src import BookRegistry, MemoryBudget, Packet, SlidingBook
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.clock = lambda: self.now[0]
+
+    def make_book(self, budget):
+        return SlidingBook(num_pages=4, page_size=4, timeout=60, clock=self.clock, budget=budget)
+
+    def add(self, book, SNs, at):
+        self.now[0] = at
+        return [book.add_packet(Packet(SN=SN, message=b'x' * 8, mac=b'tg')) for SN in SNs]
+
+    def test_accounting_follows_pages(self):
+        # Test that accepted bytes are charged and credited back when pages leave the book
+        budget = MemoryBudget(max_bytes=1000)
+        book = self.make_book(budget)
+        self.add(book, [0, 1, 5], at=0)
+        self.assertEqual((budget.used, book.stats()['buffered_bytes']), (30, 30))
+        book.add_packets([2, 3, 6], [b'x' * 8] * 3)
+        self.assertEqual(budget.used, 18)  # Page 0 completed; page 1 holds SN 5 with its MAC and SN 6
+        book.expire(100.0)
+        self.assertEqual(budget.used, 0)
+
+    def test_oldest_page_is_evicted_first(self):
+        # Test that going over the budget evicts the least recently updated page of any book
+        budget = MemoryBudget(max_bytes=50, low_water=1.0)
+        first, second = self.make_book(budget), self.make_book(budget)
+        self.add(first, [0, 4], at=0)
+        self.add(second, [0, 1], at=1)
+        self.add(first, [5], at=2)
+        pages = self.add(second, [8], at=3)  # 60 bytes: first's page 0 is the oldest
+
+        self.assertEqual(pages, [None])
+        self.assertEqual(budget.used, 50)
+        evicted = first.expire()
+        self.assertEqual([(page.min_SN, page.occupancy) for page in evicted], [(0, 1)])
+        self.assertEqual(first.stats()['budget_evictions'], 1)
+        self.assertEqual(budget.evictions, 1)
+
+    def test_least_complete_policy(self):
+        # Test that the emptiest page goes first and is returned by the book's own next call
+        budget = MemoryBudget(max_bytes=50, policy='least_complete', low_water=1.0)
+        book = self.make_book(budget)
+        self.add(book, [0, 1, 2, 4, 8], at=0)
+        page = self.add(book, [9], at=1)[0]  # Page 1 and page 2 hold one packet; page 1 is older
+        self.assertEqual((page.min_SN, page.occupancy), (4, 1))
+
+    def test_fair_share_policy(self):
+        # Test that the book holding the most bytes gives up its oldest page
+        budget = MemoryBudget(max_bytes=50, policy='fair_share', low_water=1.0)
+        small, large = self.make_book(budget), self.make_book(budget)
+        self.add(small, [0], at=0)
+        self.add(large, [0, 4, 8], at=1)
+        self.add(large, [12], at=2)
+        self.add(small, [1], at=3)
+        self.assertEqual([page.min_SN for page in large.expire()], [0])
+        self.assertEqual(small.expire(), [])
+        self.assertEqual(budget.books[small], 20)
+
+    def test_registry_releases_retired_books(self):
+        # Test that retiring a flow forgets its book in the shared budget
+        budget = MemoryBudget(max_bytes=1000)
+        registry = BookRegistry(num_pages=2, page_size=4, timeout=60, budget=budget)
+        registry.add_packet('a', Packet(SN=0, message=b'x'))
+        self.assertEqual((len(budget), budget.used), (1, 1))
+        registry.retire('a')
+        self.assertEqual((len(budget), budget.used), (0, 0))
+
+    def test_victims_are_indexed(self):
+        # Test that victims come from the index built while charging, without walking the books' pages
+        for policy in MemoryBudget.POLICIES:
+            budget = MemoryBudget(max_bytes=10 ** 6, policy=policy, low_water=1.0)
+            books = [self.make_book(budget) for _ in range(50)]
+            for at, book in enumerate(books):
+                self.add(book, [0, 4, 5], at=at)
+            saved = SlidingBook.pages
+            SlidingBook.pages = property(lambda book: self.fail("pages scanned"))
+            try:
+                budget.max_bytes = budget.used + 5  # The next packet goes 5 bytes over: one page goes
+                returned = self.add(books[-1], [6], at=100)
+            finally:
+                SlidingBook.pages = saved
+            expected = {'oldest': (books[0], 0), 'least_complete': (books[0], 0), 'fair_share': (books[-1], 0)}[policy]
+            book, page_index = expected
+            evicted = [page for page in returned if page is not None] + book.drain_ready()
+            self.assertEqual([page.min_SN // 4 for page in evicted], [page_index], policy)
+            self.assertLessEqual(len(budget.heap), 2 * len(budget.versions) + 64)
+
+    def test_idle_flow_evictions_reach_registry_expire(self):
+        # Test that a page evicted from a flow that receives nothing more comes out of the next expire pass
+        budget = MemoryBudget(max_bytes=25, low_water=1.0)
+        registry = BookRegistry(clock=self.clock, num_pages=4, page_size=4, timeout=60, budget=budget,
+                                book_factory=lambda **kwargs: SlidingBook(clock=self.clock, **kwargs))
+        registry.add_packet('idle', Packet(SN=0, message=b'x' * 8, mac=b'tg'))
+        self.now[0] = 1
+        registry.add_packet('busy', Packet(SN=0, message=b'x' * 8, mac=b'tg'))
+        registry.add_packet('busy', Packet(SN=4, message=b'x' * 8, mac=b'tg'))
+        self.assertEqual([(flow_id, page.min_SN) for flow_id, page in registry.expire()], [('idle', 0)])
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            MemoryBudget(max_bytes=10, policy='random')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from src import CaptureReader, CaptureWriter, Packet, SlidingBook
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'traffic.cap')
+        # (SN, arrival time): page 0 of SNs 0-1 never completes, page 1 arrives out of order
+        self.arrivals = [(0, 10.0), (3, 10.5), (2, 11.0), (5, 14.0), (4, 14.5)]
+        with CaptureWriter(self.path) as writer:
+            for SN, arrival in self.arrivals:
+                writer.write(Packet(SN=SN, message=b'm%d' % SN, mac=b'tag', timestamp=SN / 10), arrival)
+
+    def test_records_keep_packet_timestamps(self):
+        # Test that the capture holds the packets' own timestamps and the index their arrival
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(reader.index['SN'].tolist(), [0, 3, 2, 5, 4])
+            self.assertEqual(reader.index['time'].tolist(), [10.0, 10.5, 11.0, 14.0, 14.5])
+            packet = reader.packets()[1]
+            self.assertEqual((packet.SN, packet.message, packet.mac, packet.timestamp), (3, b'm3', b'tag', 0.3))
+
+    def test_select_by_SN_and_time(self):
+        # Test seeking by arrival time and by SN range
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(reader.select(start_time=10.5, stop_time=14.0).tolist(), [1, 2])
+            self.assertEqual(reader.select(start_SN=2, stop_SN=4).tolist(), [1, 2])
+            self.assertEqual(reader.select(start_SN=4, start_time=11.0).tolist(), [3, 4])
+            self.assertEqual(reader.batch(reader.select(stop_SN=1)).SNs.tolist(), [0])
+
+    def test_replay_uses_recorded_time(self):
+        # Test that a replayed book times out pages on the recorded clock, not the wall clock
+        with CaptureReader(self.path) as reader:
+            book = SlidingBook(num_pages=2, page_size=2, timeout=2.0, clock=reader.clock)
+            pages = list(reader.replay(book, batch_size=1))
+            self.assertEqual([[p.SN for p in page.packets if p is not None] for page in pages],
+                             [[2, 3], [0], [4, 5]])
+            self.assertEqual(reader.clock(), 14.5)
+
+    def test_replay_at_recorded_pace(self):
+        # Test that pacing sleeps through the recorded gaps, scaled by the speed
+        slept = []
+        with CaptureReader(self.path) as reader:
+            book = SlidingBook(num_pages=2, page_size=2, timeout=60, clock=reader.clock)
+            list(reader.replay(book, speed=2.0, batch_size=2, sleep=slept.append, wallclock=lambda: 0.0))
+        self.assertEqual(slept, [0.5, 2.25])
+
+    def test_truncated_capture(self):
+        # Test that an index entry without its full record is ignored
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import numpy as np
+from functools import partial
+from src import ColumnarPage, Packet, SlidingBook
+
+class TestColumnarPage(unittest.TestCase):
+
+    def test_page_initialization(self):
+        # Test that a columnar page initializes correctly inside a single buffer
+        page = ColumnarPage(page_size=5, payload_size=128, mac_size=16)
+        self.assertEqual(page.page_size, 5)
+        self.assertFalse(page.presence.any())
+        self.assertIsNone(page.min_SN)
+        self.assertEqual(page.occupancy, 0)
+        self.assertEqual(len(page.buffer), ColumnarPage.nbytes(5, 128, 16))
+
+    def test_invalid_payload_size(self):
+        # Test that the slot size must be one of the allowed payload sizes
+        with self.assertRaises(ValueError):
+            ColumnarPage(page_size=5, payload_size=100)
+
+    def test_add_packet(self):
+        # Test adding packets and reading them back
+        page = ColumnarPage(page_size=5, payload_size=128, mac_size=16)
+        packet = Packet(SN=7, message=b'message7', mac=b'mac7', timestamp=1.5)
+
+        self.assertTrue(page.add_packet(packet))
+        self.assertEqual(page.min_SN, 5)
+        self.assertEqual(page.max_SN, 10)
+        self.assertEqual(page.occupancy, 1)
+        self.assertEqual(bytes(page.message(2)), b'message7')
+        self.assertEqual(bytes(page.mac(2)), b'mac7')
+
+        restored = page.get_packet(2)
+        self.assertEqual((restored.SN, restored.message, restored.mac, restored.timestamp), (7, b'message7', b'mac7', 1.5))
+        self.assertIsNone(page.get_packet(0))
+
+    def test_reject_duplicate_and_out_of_range(self):
+        # Test that duplicates and SNs from other pages are rejected
+        page = ColumnarPage(page_size=5, payload_size=128)
+        self.assertTrue(page.add_record(1, b'first'))
+        self.assertFalse(page.add_record(1, b'second'))
+        self.assertFalse(page.add_record(6, b'other page'))
+        self.assertEqual(bytes(page.message(1)), b'first')
+        self.assertEqual(page.occupancy, 1)
+
+    def test_oversized_message(self):
+        # Test that a message larger than the slot raises
+        page = ColumnarPage(page_size=2, payload_size=128)
+        with self.assertRaises(ValueError):
+            page.add_record(2, b'a' * 129)
+        # The rejected packet leaves the page untouched, so it can still take its first page
+        self.assertIsNone(page.min_SN)
+        self.assertTrue(page.add_record(0, b'a'))
+        self.assertEqual(page.min_SN, 0)
+
+    def test_slots_follow_payload_class(self):
+        # Test that a page without payload_size sizes its slots from the messages it receives
+        page = ColumnarPage(page_size=4, mac_size=16)
+        self.assertEqual(page.payload_size, 0)
+        page.add_record(0, b'a' * 100, mac=b'tag0')
+        self.assertEqual(page.payload_size, 128)
+        self.assertEqual(len(page.buffer), ColumnarPage.nbytes(4, 128, 16))
+
+        page.add_record(2, b'b' * 300, mac=b'tag2')  # Moves the page to the 512-byte class
+        self.assertEqual(page.payload_size, 512)
+        self.assertEqual((bytes(page.message(0)), bytes(page.mac(0))), (b'a' * 100, b'tag0'))
+        self.assertEqual(page.bitmap(), 0b0101)
+        page.clear()
+        self.assertEqual(page.payload_size, 512)  # Kept for reuse
+        with self.assertRaises(ValueError):
+            page.add_record(4, b'c' * 1025)
+
+    def test_fill_missing_and_clear(self):
+        # Test filling missing slots and clearing the page
+        page = ColumnarPage(page_size=5, payload_size=128)
+        page.add_record(0, b'message0')
+        page.add_record(2, b'message2')
+        page.fill_missing_packets()
+
+        self.assertTrue(page.is_full())
+        self.assertEqual(page.SNs.tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual([p.message for p in page.packets], [b'message0', b'', b'message2', b'', b''])
+
+        page.clear()
+        self.assertFalse(page.presence.any())
+        self.assertEqual(page.occupancy, 0)
+        self.assertIsNone(page.min_SN)
+
+    def test_export(self):
+        # Test exporting the present slots as arrays
+        page = ColumnarPage(page_size=4, payload_size=128)
+        page.add_record(3, b'ccc', timestamp=3.0)
+        page.add_record(1, b'a', timestamp=1.0)
+
+        SNs, timestamps, lengths, payloads = page.export()
+        self.assertEqual(SNs.tolist(), [1, 3])
+        self.assertEqual(timestamps.tolist(), [1.0, 3.0])
+        self.assertEqual(lengths.tolist(), [1, 3])
+        self.assertEqual(payloads.shape, (2, 128))
+        self.assertEqual(bytes(payloads[1, :3]), b'ccc')
+
+    def test_sliding_book_with_columnar_pages(self):
+        # Test that a SlidingBook can buffer packets in columnar pages
+        book = SlidingBook(num_pages=2, page_size=2, page_factory=partial(ColumnarPage, payload_size=128))
+        self.assertIsNone(book.add_packet(Packet(SN=1, message=b'b')))
+        page = book.add_packet(Packet(SN=0, message=b'a'))
+
+        self.assertIsInstance(page, ColumnarPage)
+        self.assertEqual(page.SNs.tolist(), [0, 1])
+        completed = book.add_packets(np.array([3, 2]), [b'd', b'c'])
+        self.assertEqual([bytes(completed[0].message(i)) for i in range(2)], [b'c', b'd'])
+
+    def test_bitmap_and_missing_ranges(self):
+        # Test that the columnar page reports the same bitmap as Page
+        page = ColumnarPage(page_size=8, payload_size=128)
+        for SN in [9, 10, 13, 15]:
+            page.add_record(SN, b'x')
+        self.assertEqual(page.bitmap(), 0b10100110)
+        self.assertEqual(page.presence_bits.tolist(), [0b10100110])  # One bit per slot in the buffer
+        self.assertEqual(page.missing_ranges(), [(8, 9), (11, 13), (14, 15)])
+
+if __name__ == '__main__':
+    unittest.main()
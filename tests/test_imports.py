@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+class TestImports(unittest.TestCase):
+
+    def test_import_is_lightweight(self):
+        # Test that importing the package loads none of the heavy optional modules
+        loaded = run_python(
+            "import sys, src\n"
+            "print(sorted(m for m in ('numpy', 'asyncio', 'multiprocessing', 'concurrent.futures') if m in sys.modules))")
+        self.assertEqual(loaded.strip(), '[]')
+
+    def test_star_import_without_numpy(self):
+        # Test that `from src import *` only binds the eagerly imported names, so it needs neither NumPy nor asyncio
+        output = run_python(
+            "import sys\n"
+            "sys.modules['numpy'] = None\n"
+            "from src import *\n"
+            "print(SlidingBook.__name__, 'ColumnarPage' in dir(), 'asyncio' in sys.modules)")
+        self.assertEqual(output.strip(), "SlidingBook False False")
+
+    def test_book_works_without_numpy(self):
+        # Test that the single-packet path of SlidingBook and Page runs with NumPy unavailable
+        output = run_python(
+            "import sys\n"
+            "sys.modules['numpy'] = None  # Any import of NumPy now fails\n"
+            "from src import Packet, SlidingBook\n"
+            "book = SlidingBook(num_pages=2, page_size=2, timeout=60)\n"
+            "source = [Packet(SN=SN, message=b'x') for SN in (1, 0, 2)]\n"
+            "pages = list(book.stream(source))\n"
+            "pages[1].fill_missing_packets(shared=True)\n"
+            "print([page.occupancy for page in pages], book.stats()['accepted'], pages[1].to_bytes())")
+        self.assertEqual(output.strip(), "[2, 2] 3 b'x'")
+
+    def test_receiver_works_without_numpy(self):
+        # Test that datagrams received over UDP are decoded and batched with NumPy unavailable
+        output = run_python(
+            "import sys\n"
+            "sys.modules['numpy'] = None\n"
+            "import asyncio\n"
+            "from src import Packet, SlidingBook, open_receiver, send_packets\n"
+            "async def main():\n"
+            "    book = SlidingBook(num_pages=2, page_size=2, timeout=60)\n"
+            "    transport, receiver = await open_receiver(book, ('127.0.0.1', 0))\n"
+            "    try:\n"
+            "        packets = [Packet(SN=SN, message=b'm%d' % SN) for SN in (1, 0, 3, 2)]\n"
+            "        await send_packets(packets, transport.get_extra_info('sockname'))\n"
+            "        receiver.datagram_received(b'short', None)\n"
+            "        pages = [await asyncio.wait_for(receiver.queue.get(), 5) for _ in range(2)]\n"
+            "        await asyncio.sleep(0)\n"
+            "    finally:\n"
+            "        transport.close()\n"
+            "    print([page.to_bytes() for page in pages], receiver.malformed)\n"
+            "asyncio.run(main())")
+        self.assertEqual(output.strip(), "[b'm0m1', b'm2m3'] 1")
+
+    def test_numpy_features_fail_early(self):
+        # Test that features built on NumPy say how to install it when it is unavailable
+        output = run_python(
+            "import sys\n"
+            "sys.modules['numpy'] = None\n"
+            "import src\n"
+            "try:\n"
+            "    src.ParityCodec\n"
+            "except ImportError as error:\n"
+            "    print(error)")
+        self.assertEqual(output.strip(), "ParityCodec needs NumPy; install it with `pip install .[numpy]`.")
+
+    def test_lazy_attributes(self):
+        # Test that names imported on first access resolve and are listed
+        import src
+        self.assertIn('PageVerifier', dir(src))
+        self.assertIs(src.ColumnarPage, __import__('src.ColumnarPage', fromlist=['ColumnarPage']).ColumnarPage)
+        with self.assertRaises(AttributeError):
+            src.NoSuchThing
+
+if __name__ == '__main__':
+    unittest.main()
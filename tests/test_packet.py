@@ -1,6 +1,6 @@
 import unittest
 import struct
-from src import Packet 
+from src import Packet, PacketBatch, PacketPool, Page
 
 class TestPacket(unittest.TestCase):
 
@@ -77,5 +77,101 @@ class TestPacket(unittest.TestCase):
         self.assertEqual(packet.mac, reconstructed_packet.mac)
         self.assertAlmostEqual(packet.timestamp, reconstructed_packet.timestamp, places=6)
 
+    def test_batch_from_concatenated_frames(self):
+        # Test decoding back-to-back framed packets with a fixed MAC size
+        packets = [Packet(SN=sn, message=b'm' * sn, mac=bytes([sn]) * 4) for sn in range(5)]
+        buffer = bytearray(b''.join(packet.to_bytes() for packet in packets))
+        batch = PacketBatch.from_buffer(buffer, mac_size=4)
+
+        self.assertEqual(len(batch), 5)
+        self.assertEqual(batch.SNs.tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(batch.message_lengths.tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual([bytes(m) for m in batch.messages], [packet.message for packet in packets])
+        self.assertEqual([bytes(m) for m in batch.macs], [packet.mac for packet in packets])
+
+        # The messages are views into the receive buffer, not copies
+        buffer[20 + 16] = ord('x')  # First byte of the second message
+        self.assertEqual(bytes(batch.messages[1]), b'x')
+
+    def test_batch_from_strided_buffer(self):
+        # Test decoding a recvmmsg-style buffer with one datagram per fixed-size slot
+        packets = [Packet(SN=10 + i, message=b'abc' * i, mac=b'tag' * i) for i in range(3)]
+        stride = 64
+        buffer = bytearray(stride * len(packets))
+        sizes = []
+        for i, packet in enumerate(packets):
+            data = packet.to_bytes()
+            buffer[i * stride:i * stride + len(data)] = data
+            sizes.append(len(data))
+
+        batch = PacketBatch.from_buffer(buffer, sizes=sizes, stride=stride)
+        self.assertEqual(batch.SNs.tolist(), [10, 11, 12])
+        self.assertEqual([bytes(m) for m in batch.messages], [b'', b'abc', b'abcabc'])
+        self.assertEqual([bytes(m) for m in batch.macs], [b'', b'tag', b'tagtag'])
+
+        restored = batch.to_packets()
+        self.assertEqual(restored[2].message, b'abcabc')
+        self.assertEqual(restored[2].mac, b'tagtag')
+
+        # Copies come out as bytes, sliced straight from a bytes buffer without views
+        for source in (buffer, bytes(buffer)):
+            messages, macs = PacketBatch.from_buffer(source, sizes=sizes, stride=stride).copy_fields()
+            self.assertEqual((messages, macs), ([b'', b'abc', b'abcabc'], [b'', b'tag', b'tagtag']))
+            self.assertEqual({type(message) for message in messages + macs}, {bytes})
+
+    def test_batch_rejects_truncated_buffer(self):
+        # Test that a truncated packet raises instead of reading past the buffer
+        data = Packet(SN=1, message=b'message', mac=b'').to_bytes()
+        with self.assertRaises(ValueError):
+            PacketBatch.from_buffer(data[:-1], mac_size=0)
+        with self.assertRaises(ValueError):
+            PacketBatch.from_buffer(data, sizes=[len(data) + 1])
+
+    def test_batch_rejects_oversized_message(self):
+        # Test that a message longer than any payload class is rejected at decode time, not when it is added
+        data = struct.pack('!Qd', (1 << 32) | 2000, 0.0) + bytes(2000)
+        with self.assertRaises(ValueError):
+            PacketBatch.from_buffer(data, sizes=[len(data)])
+        with self.assertRaises(ValueError):
+            PacketBatch.from_buffer(data, mac_size=0)
+
+    def test_to_bytes_shared_timestamp(self):
+        # Test that a given timestamp is encoded instead of the current time
+        packets = [Packet(SN=sn, message=b'm' * sn, mac=b'0123456789ABCDEF') for sn in range(4)]
+        datagrams = [packet.to_bytes(12.5) for packet in packets]
+        for packet, datagram in zip(packets, datagrams):
+            self.assertEqual(datagram[:8] + datagram[16:], packet.to_bytes()[:8] + packet.to_bytes()[16:])
+            self.assertEqual(Packet.from_bytes(datagram).timestamp, 12.5)
+
+        batch = PacketBatch.from_buffer(b''.join(datagrams), mac_size=16)
+        self.assertEqual(batch.SNs.tolist(), [0, 1, 2, 3])
+
+    def test_payload_size_classes(self):
+        # Test the size class lookup at the class boundaries
+        for length, size in [(0, 0), (1, 128), (128, 128), (129, 256), (512, 512), (513, 1024), (1024, 1024)]:
+            self.assertEqual(Packet(SN=0, message=b'a' * length).payload_size, size)
+
+    def test_packet_has_no_dict(self):
+        # Test that packets are slotted
+        packet = Packet(SN=1, message=b'message')
+        self.assertFalse(hasattr(packet, '__dict__'))
+        with self.assertRaises(AttributeError):
+            packet.extra = 1
+
+    def test_packet_pool(self):
+        # Test that released packets are reused with fresh fields
+        pool = PacketPool(max_size=1)
+        packet = pool.acquire(1, b'first', b'mac', 1.0)
+        packet.verifing_bytes = 3
+        pool.release(packet)
+        pool.release(Packet(SN=2, message=b'dropped'))  # The pool is already full
+        self.assertEqual(len(pool), 1)
+
+        reused = pool.acquire(5, b'a' * 200)
+        self.assertIs(reused, packet)
+        self.assertEqual((reused.SN, reused.message, reused.mac, reused.timestamp), (5, b'a' * 200, b'', 0))
+        self.assertEqual((reused.payload_size, reused.verifing_bytes), (256, 0))
+        self.assertEqual(len(pool), 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -125,7 +125,31 @@ class TestPage(unittest.TestCase):
         self.assertEqual(page.packets[4].message, b'')
 
 
-        
+    def test_bitmap_and_missing_ranges(self):
+        # Test the presence bitmap and the missing SN ranges of a page
+        page = Page(page_size=8)
+        self.assertEqual(page.missing_ranges(), [])
+        for SN in [9, 10, 13, 15]:
+            page.add_packet(Packet(SN=SN, message=b'x'))
+
+        self.assertEqual(page.bitmap(), 0b10100110)
+        self.assertEqual(page.missing_ranges(), [(8, 9), (11, 13), (14, 15)])
+
+    def test_fill_missing_packets_shared(self):
+        # Test filling missing slots with the shared placeholder
+        page = Page(page_size=5)
+        page.add_packet(Packet(SN=1, message=b'message1'))
+        page.add_packet(Packet(SN=4, message=b'message4'))
+        page.fill_missing_packets(shared=True)
+
+        self.assertTrue(page.is_full())
+        self.assertIs(page.packets[0], Page.MISSING)
+        self.assertIs(page.packets[3], Page.MISSING)
+        self.assertEqual(page.packets[1].message, b'message1')
+        with self.assertRaises(AttributeError):
+            page.packets[0].verifing_bytes = 1  # The placeholder is shared by every page
+        self.assertEqual((Page.MISSING.SN, Page.MISSING.message, Page.MISSING.verifing_bytes), (-1, b'', 0))
+        self.assertEqual(page.missing_ranges(), [])
 
 if __name__ == '__main__':
     unittest.main()
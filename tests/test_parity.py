@@ -0,0 +1,112 @@
+import os
+import unittest
+from src import ColumnarPage, Packet, Page, ParityCodec, SlidingBook
+
+class TestParityCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.clock = lambda: self.now[0]
+
+    def page_packets(self, codec, page_index=0):
+        """Data packets of one page with varying message and MAC lengths, followed by the repair packets."""
+        base = page_index * codec.page_size
+        data = [Packet(SN=base + slot, message=os.urandom(1000 + 3 * slot), mac=os.urandom(slot % 20),
+                       timestamp=slot / 10) for slot in range(codec.data_slots)]
+        return data, codec.encode(data)
+
+    def test_data_SN_skips_repair_slots(self):
+        # Test that data packets never land in the reserved last k slots of a page
+        codec = ParityCodec(page_size=6, k=2)
+        self.assertEqual([codec.data_SN(i) for i in range(9)], [0, 1, 2, 3, 6, 7, 8, 9, 12])
+
+    def test_encode(self):
+        # Test that repair packets take the reserved SNs and are padded to the longest message
+        codec = ParityCodec(page_size=8, k=2)
+        data, repairs = self.page_packets(codec, page_index=3)
+        self.assertEqual([packet.SN for packet in repairs], [30, 31])
+        self.assertEqual({len(packet.message) for packet in repairs}, {1000 + 3 * 5})
+        with self.assertRaises(ValueError):
+            codec.encode(data[:-1])
+        with self.assertRaises(ValueError):
+            ParityCodec(page_size=8, k=8)
+
+    def test_xor_recovers_one_packet(self):
+        # Test that k=1 rebuilds any single missing data packet exactly, timestamp and MAC included
+        codec = ParityCodec(page_size=5, k=1)
+        data, repairs = self.page_packets(codec)
+        for lost in range(codec.data_slots):
+            page = Page(page_size=5)
+            for packet in data[:lost] + data[lost + 1:] + repairs:
+                page.add_packet(packet)
+            self.assertEqual(codec.recover(page), 1)
+            self.assertTrue(page.is_full())
+            rebuilt = page.packets[lost]
+            self.assertEqual((rebuilt.SN, rebuilt.message, rebuilt.mac, rebuilt.timestamp),
+                             (data[lost].SN, data[lost].message, data[lost].mac, data[lost].timestamp))
+
+    def test_reed_solomon_recovers_k_packets(self):
+        # Test that any k missing data packets are rebuilt from the k repair packets, on both page types
+        codec = ParityCodec(page_size=10, k=3)
+        data, repairs = self.page_packets(codec)
+        for page_factory in (Page, ColumnarPage):
+            for lost in ([0, 1, 2], [2, 4, 6], [4, 5, 6], [6]):
+                page = page_factory(page_size=10)
+                for packet in [packet for slot, packet in enumerate(data) if slot not in lost] + repairs:
+                    page.add_packet(packet)
+                self.assertEqual(codec.recover(page), len(lost))
+                self.assertTrue(page.is_full())
+                # The repair slots read as empty packets, so consumers see only the data
+                self.assertEqual(bytes(page.to_bytes()), b''.join(packet.message for packet in data))
+                self.assertEqual(page.buffered_bytes, sum(len(packet.message) + len(packet.mac) for packet in data))
+
+    def test_mismatched_repair_lengths(self):
+        # Test that repair packets of different sizes are rejected alike on both page types
+        codec = ParityCodec(page_size=6, k=2)
+        data, repairs = self.page_packets(codec)
+        repairs[1] = Packet(SN=repairs[1].SN, message=repairs[1].message[:-1], mac=repairs[1].mac)
+        for page_factory in (Page, ColumnarPage):
+            page = page_factory(page_size=6)
+            for packet in data[2:] + repairs:
+                page.add_packet(packet)
+            self.assertEqual(codec.recover(page), 0)
+            self.assertFalse(page.is_full())
+
+    def test_too_few_packets(self):
+        # Test that a page missing more data packets than it holds repair packets is left alone
+        codec = ParityCodec(page_size=6, k=2)
+        data, repairs = self.page_packets(codec)
+        page = Page(page_size=6)
+        for packet in data[2:] + repairs[:1]:
+            page.add_packet(packet)
+        self.assertEqual(codec.recover(page), 0)
+        self.assertEqual(page.occupancy, 3)
+
+    def test_book_completes_page_on_recovery(self):
+        # Test that the book hands out a page as soon as its missing packet can be rebuilt
+        codec = ParityCodec(page_size=4, k=1)
+        book = SlidingBook(num_pages=4, page_size=4, timeout=60, clock=self.clock, parity=codec)
+        data, repairs = self.page_packets(codec)
+        self.assertIsNone(book.add_packet(data[0]))
+        self.assertIsNone(book.add_packet(data[2]))
+        page = book.add_packet(repairs[0])
+        self.assertIsNotNone(page)
+        self.assertEqual(page.packets[1].message, data[1].message)
+        self.assertEqual(book.global_min_SN, 4)
+        self.assertEqual((book.metrics.parity_recovered, book.metrics.completed_full), (1, 1))
+
+        self.assertEqual((page.packets[3].SN, page.packets[3].message), (3, b''))  # Repair packet replaced
+
+        # With nothing lost the page completes without waiting for its repair packets, which are counted apart
+        data, repairs = self.page_packets(codec, page_index=1)
+        pages = book.add_packets(data + repairs)
+        self.assertEqual(len(pages), 1)
+        self.assertEqual((pages[0].packets[3].SN, pages[0].packets[3].message), (7, b''))
+        self.assertIsNot(pages[0].packets[3], Page.MISSING)
+        self.assertEqual(book.add_packet(repairs[0]), None)
+        stats = book.stats()
+        self.assertEqual((stats['parity_recovered'], stats['parity_late'], stats['below_window'], stats['duplicate']),
+                         (1, 2, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import asyncio
+import struct
+import random
+from src import BookReceiver, Packet, SlidingBook, open_receiver, send_packets
+
+LOCALHOST = ('127.0.0.1', 0)
+
+class TestBookReceiver(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.packets = [Packet(SN=sn, message=b'message%d' % sn, mac=b'\0' * 48) for sn in range(16)]
+        random.Random(1).shuffle(self.packets)
+
+    async def test_receive_pages(self):
+        # Test that pages completed from UDP datagrams reach the queue
+        book = SlidingBook(num_pages=4, page_size=4, timeout=10)
+        transport, receiver = await open_receiver(book, LOCALHOST)
+        try:
+            await send_packets(self.packets, transport.get_extra_info('sockname'))
+            pages = [await asyncio.wait_for(receiver.queue.get(), 5) for _ in range(4)]
+        finally:
+            transport.close()
+
+        self.assertEqual(sorted(page.min_SN for page in pages), [0, 4, 8, 12])
+        for page in pages:
+            self.assertTrue(page.is_full())
+            self.assertEqual(page.packets[1].message, b'message%d' % (page.min_SN + 1))
+        self.assertEqual(receiver.received, 16)
+
+    async def test_expire_from_event_loop(self):
+        # Test that incomplete pages are evicted by the periodic expiry
+        book = SlidingBook(num_pages=4, page_size=4, timeout=0.01)
+        transport, receiver = await open_receiver(book, LOCALHOST, expire_interval=0.005)
+        try:
+            await send_packets([Packet(SN=1, message=b'lonely')], transport.get_extra_info('sockname'))
+            page = await asyncio.wait_for(receiver.queue.get(), 5)
+        finally:
+            transport.close()
+        self.assertEqual(page.occupancy, 1)
+        self.assertEqual(page.packets[1].message, b'lonely')
+
+    async def test_drop_policy(self):
+        # Test that pages are dropped and counted when the queue is full
+        book = SlidingBook(num_pages=4, page_size=4, timeout=10)
+        transport, receiver = await open_receiver(book, LOCALHOST, maxsize=1, policy='drop')
+        try:
+            await send_packets(sorted(self.packets, key=lambda p: p.SN), transport.get_extra_info('sockname'))
+            for _ in range(100):
+                if receiver.received == 16:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            transport.close()
+        self.assertEqual(receiver.queue.qsize(), 1)
+        self.assertEqual(receiver.dropped_pages, 3)
+
+    async def test_block_policy(self):
+        # Test that reading pauses while the queue is full and no page is lost
+        book = SlidingBook(num_pages=4, page_size=4, timeout=10)
+        transport, receiver = await open_receiver(book, LOCALHOST, maxsize=1, policy='block')
+        try:
+            await send_packets(sorted(self.packets, key=lambda p: p.SN), transport.get_extra_info('sockname'))
+            pages = [await asyncio.wait_for(receiver.queue.get(), 5) for _ in range(4)]
+        finally:
+            transport.close()
+        self.assertEqual([page.min_SN for page in pages], [0, 4, 8, 12])
+        self.assertEqual(receiver.dropped_pages, 0)
+
+    async def test_malformed_datagram(self):
+        # Test that a malformed datagram is counted and the rest of the batch is kept
+        book = SlidingBook(num_pages=4, page_size=1, timeout=10)
+        receiver = BookReceiver(book)
+        receiver.datagram_received(b'short', None)
+        receiver.datagram_received(Packet(SN=0, message=b'ok').to_bytes(), None)
+        await asyncio.sleep(0)
+        self.assertEqual(receiver.malformed, 1)
+        self.assertEqual(receiver.queue.get_nowait().packets[0].message, b'ok')
+
+    async def test_oversized_datagram(self):
+        # Test that a datagram declaring a message above the largest payload is malformed, not fatal to the batch
+        book = SlidingBook(num_pages=4, page_size=1, timeout=10)
+        receiver = BookReceiver(book)
+        receiver.datagram_received(Packet(SN=0, message=b'ok').to_bytes(), None)
+        receiver.datagram_received(struct.pack('!Qd', (1 << 32) | 2000, 0.0) + bytes(2000), None)
+        await asyncio.sleep(0)
+        self.assertEqual(receiver.malformed, 1)
+        self.assertEqual(receiver.queue.get_nowait().packets[0].message, b'ok')
+        self.assertEqual(book.stats()['accepted'], 1)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            BookReceiver(SlidingBook(), policy='wait')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from src import BookRegistry, Packet, ShardedBookRegistry, SharedRing, SlidingBook
+
+class TestBookRegistry(unittest.TestCase):
+
+    def test_books_created_per_flow(self):
+        # Test that each flow gets its own book on first use
+        registry = BookRegistry(num_pages=2, page_size=2)
+        self.assertIsNone(registry.add_packet('a', Packet(SN=0, message=b'a0')))
+        self.assertIsNone(registry.add_packet('b', Packet(SN=1, message=b'b1')))
+        page = registry.add_packet('a', Packet(SN=1, message=b'a1'))
+
+        self.assertEqual(len(registry), 2)
+        self.assertIn('b', registry)
+        self.assertEqual([p.message for p in page.packets], [b'a0', b'a1'])
+        self.assertEqual(registry.get('b').pages[0].packets[1].message, b'b1')
+
+    def test_idle_flows_retired(self):
+        # Test that idle flows are retired and hand back their partial pages
+        now = [0.0]
+        clock = lambda: now[0]
+        registry = BookRegistry(idle_timeout=5.0, clock=clock, num_pages=2, page_size=2, timeout=100)
+        registry.add_packet(1, Packet(SN=0, message=b'x'))
+        now[0] = 3.0
+        registry.add_packet(2, Packet(SN=2, message=b'y'))
+
+        now[0] = 6.0
+        expired = registry.expire()
+        self.assertEqual([(flow_id, page.min_SN) for flow_id, page in expired], [(1, 0)])
+        self.assertNotIn(1, registry)
+        self.assertIn(2, registry)
+
+    def test_retire_hands_back_ready_and_stashed(self):
+        # Test that retire returns pages completed from the stash and pages still stashed, not only buffered ones
+        registry = BookRegistry(num_pages=2, page_size=2, timeout=100, stash_bytes=1024)
+        for SN in (4, 5, 6, 0, 2):  # 4 to 6 arrive ahead of the window and are stashed
+            registry.add_packet(1, Packet(SN=SN, message=bytes([SN])))
+        registry.add_packet(1, Packet(SN=1, message=b'\x01'))  # Completes page 0, which drains page 2 into ready
+
+        book = registry.get(1)
+        self.assertEqual((len(book.ready), book.stash_size > 0), (1, True))
+        pages = registry.retire(1)
+        self.assertEqual([(page.min_SN, page.occupancy) for page in pages], [(2, 1), (4, 2), (6, 1)])
+        self.assertEqual(book.stats()['stash_misses'], 0)
+
+    def test_expire_uses_given_time(self):
+        # Test that the time passed to expire reaches the books, not only the idle check
+        clock = lambda: 0.0
+        registry = BookRegistry(book_factory=lambda **kwargs: SlidingBook(clock=clock, **kwargs), clock=clock,
+                                num_pages=2, page_size=2, timeout=1.0)
+        registry.add_packet(1, Packet(SN=0, message=b'x'))
+        self.assertEqual(registry.expire(now=0.5), [])
+        self.assertEqual([(flow_id, page.min_SN) for flow_id, page in registry.expire(now=2.0)], [(1, 0)])
+
+class TestSharedRing(unittest.TestCase):
+
+    def test_put_get_wraps_around(self):
+        # Test records that wrap past the end of the ring
+        ring = SharedRing(capacity=32)
+        try:
+            for i in range(10):
+                self.assertTrue(ring.put(b'ab', bytes([i]) * 8))
+                self.assertFalse(ring.put(b'x' * 20))  # No room for a second record
+                self.assertEqual(ring.get(), b'ab' + bytes([i]) * 8)
+            self.assertIsNone(ring.get())
+            with self.assertRaises(ValueError):
+                ring.put(b'x' * 40)
+        finally:
+            ring.close(unlink=True)
+
+class TestShardedBookRegistry(unittest.TestCase):
+
+    def test_pages_from_workers(self):
+        # Test that pages of many flows come back from the worker processes
+        with ShardedBookRegistry(num_workers=2, ring_size=1 << 16, num_pages=4, page_size=4, timeout=60) as registry:
+            flows = range(6)
+            for SN in range(8):
+                for flow_id in flows:
+                    registry.submit(flow_id, Packet(SN=SN, message=b'%d:%d' % (flow_id, SN), mac=b'tag').to_bytes())
+            registry.submit(0, Packet(SN=9, message=b'partial').to_bytes())
+            self.assertTrue(registry.wait_idle(timeout=30))
+            pages = registry.poll()
+            remaining = registry.close()
+
+        self.assertEqual(len(pages), 12)
+        self.assertEqual({registry.shard(flow_id) for flow_id in flows}, {0, 1})
+        for flow_id, page in pages:
+            self.assertTrue(page.is_full())
+            self.assertEqual(page.packets[2].message, b'%d:%d' % (flow_id, page.min_SN + 2))
+            self.assertEqual(page.packets[2].mac, b'tag')
+        self.assertEqual(len(remaining), 1)
+        self.assertEqual(remaining[0][0], 0)
+        self.assertEqual(remaining[0][1].packets[1].message, b'partial')
+
+    def test_malformed_datagrams_counted(self):
+        # Test that truncated datagrams are dropped and counted without stopping the worker
+        with ShardedBookRegistry(num_workers=1, ring_size=1 << 16, num_pages=4, page_size=2, timeout=60) as registry:
+            datagram = Packet(SN=0, message=b'hello').to_bytes()
+            registry.submit(7, datagram[:5])  # Shorter than the header
+            registry.submit(7, datagram[:-2])  # Shorter than its declared message
+            registry.submit(7, datagram)
+            registry.submit(7, Packet(SN=1, message=b'world').to_bytes())
+            self.assertTrue(registry.wait_idle(timeout=30))
+            self.assertEqual(registry.malformed, 2)
+            pages = registry.poll()
+        self.assertEqual([page.packets[0].message for _, page in pages], [b'hello'])
+
+    def test_dead_worker_raises(self):
+        # Test that waiting on a worker that died raises instead of spinning forever
+        registry = ShardedBookRegistry(num_workers=1, ring_size=1 << 16, num_pages=4, page_size=2, timeout=60)
+        try:
+            registry.workers[0].terminate()
+            registry.workers[0].join()
+            registry.submit(7, Packet(SN=0, message=b'lost').to_bytes())
+            with self.assertRaises(RuntimeError):
+                registry.wait_idle()
+        finally:
+            registry.close()
+
+if __name__ == '__main__':
+    unittest.main()
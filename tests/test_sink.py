@@ -0,0 +1,81 @@
+import unittest
+import os
+import socket
+import tempfile
+from src import ColumnarPage, Packet, Page, PageSink
+
+def make_page(page_class=Page):
+    page = page_class(page_size=4)
+    page.add_packet(Packet(SN=0, message=b'abc'))
+    page.add_packet(Packet(SN=2, message=b'de'))
+    page.add_packet(Packet(SN=3, message=b'f'))
+    return page
+
+class TestPageExport(unittest.TestCase):
+
+    def test_to_bytes(self):
+        # Test skipping and zero-filling missing slots
+        for page_class in (Page, ColumnarPage):
+            page = make_page(page_class)
+            self.assertEqual(page.to_bytes(), b'abcdef')
+            self.assertEqual(page.to_bytes(fill_size=2), b'abc\0\0def')
+
+    def test_fill_size_after_fill_missing(self):
+        # Test that slots filled by fill_missing_packets are zero-filled like empty ones, for both page types
+        for page_class, shared in ((Page, False), (Page, True), (ColumnarPage, False)):
+            page = make_page(page_class)
+            page.fill_missing_packets(shared=shared)
+            self.assertEqual((page.to_bytes(), page.to_bytes(fill_size=2)), (b'abcdef', b'abc\0\0def'))
+            page.discard(1)
+            page.add_packet(Packet(SN=1, message=b''))  # Received empty, so not padded
+            self.assertEqual(page.to_bytes(fill_size=2), b'abcdef')
+
+    def test_export_into(self):
+        # Test writing into a preallocated buffer at an offset
+        page = make_page()
+        buffer = bytearray(10)
+        self.assertEqual(page.export_into(buffer, offset=2), 6)
+        self.assertEqual(bytes(buffer), b'\0\0abcdef\0\0')
+        with self.assertRaises(ValueError):
+            page.export_into(bytearray(5))
+
+    def test_columnar_buffers_are_views(self):
+        # Test that a columnar page exports views of its own buffer
+        page = make_page(ColumnarPage)
+        buffers = page.buffers()
+        self.assertIsInstance(buffers[0], memoryview)
+        self.assertEqual([bytes(buffer) for buffer in buffers], [b'abc', b'de', b'f'])
+
+class TestPageSink(unittest.TestCase):
+
+    def test_write_file(self):
+        # Test streaming pages to a file with writev
+        with tempfile.TemporaryFile() as f:
+            sink = PageSink(f, fill_size=1)
+            self.assertEqual(sink.write(make_page()), 7)
+            self.assertEqual(sink.write_pages([make_page(ColumnarPage), make_page()]), 14)
+            f.seek(0)
+            self.assertEqual(f.read(), b'abc\0def' * 3)
+            self.assertEqual(sink.bytes_written, 21)
+
+    def test_write_socket(self):
+        # Test streaming a page to a socket with sendmsg
+        left, right = socket.socketpair()
+        with left, right:
+            PageSink(left).write(make_page())
+            self.assertEqual(right.recv(100), b'abcdef')
+
+    def test_partial_writes(self):
+        # Test that partial writes are resumed where they stopped
+        read_fd, write_fd = os.pipe()
+        try:
+            sink = PageSink(write_fd)
+            sink._send = lambda buffers: os.writev(write_fd, [buffers[0][:1]])  # One byte per call
+            self.assertEqual(sink.write(make_page()), 6)
+            self.assertEqual(os.read(read_fd, 100), b'abcdef')
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+if __name__ == '__main__':
+    unittest.main()
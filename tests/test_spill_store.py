@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from src import Packet, SlidingBook, SpillStore
+
+class TestSpillStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'book.spill')
+
+    def test_book_pages_live_in_the_file(self):
+        # Test that a book backed by the store completes pages whose messages are views into the mapping
+        store = SpillStore(self.path, num_slots=8, page_size=3, payload_size=128, mac_size=16)
+        book = SlidingBook(num_pages=2, page_size=3, timeout=60, page_factory=store)
+        self.assertEqual(len(store), 2)
+
+        for SN in [2, 0]:
+            book.add_packet(Packet(SN=SN, message=b'm%d' % SN, mac=b'tag'))
+        page = book.add_packet(Packet(SN=1, message=b'm1'))
+        self.assertEqual(page.to_bytes(), b'm0m1m2')
+        self.assertIs(page.buffer.obj, store.mmap)  # The page and its views live in the mapping
+        self.assertEqual(bytes(page.mac(2)), b'tag')
+
+        book.release_page(page)
+        book.release_page(store(page_size=3))  # The free list is full, so the slot goes back to the store
+        self.assertEqual(len(store), 2)
+
+    def test_recover_after_restart(self):
+        # Test that reopening the file brings back buffered pages and pages never released
+        store = SpillStore(self.path, num_slots=8, page_size=2, payload_size=128, mac_size=16)
+        book = SlidingBook(num_pages=4, page_size=2, timeout=60, page_factory=store)
+        book.add_packets([0, 1, 4, 3], [b'a', b'b', b'e', b'd'])  # Page 0 is handed out, not released
+        store.checkpoint(book)
+        store.flush()
+        del book
+        store.close()
+
+        store = SpillStore(self.path, num_slots=8, page_size=2, payload_size=128, mac_size=16)
+        self.assertEqual(store.global_min_SN, 2)
+        self.assertEqual([page.min_SN for page in store.recovered], [0, 2, 4])
+        book = SlidingBook(num_pages=4, page_size=2, timeout=60, page_factory=store)
+        redeliver = book.restore(store.recovered, store.global_min_SN)
+        self.assertEqual([page.to_bytes() for page in redeliver], [b'ab'])
+        self.assertEqual(sorted(book.pages), [1, 2])
+
+        page = book.add_packet(Packet(SN=2, message=b'c'))
+        self.assertEqual(page.to_bytes(), b'cd')
+        self.assertEqual(book.global_min_SN, 4)
+
+    def test_full_store_falls_back_to_memory(self):
+        # Test that a book keeps ingesting when every slot is taken by pages the consumer holds
+        store = SpillStore(self.path, num_slots=3, page_size=2, payload_size=128, mac_size=16)
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, page_factory=store)
+        self.assertEqual(len(store), 2)  # The book's free list
+
+        held = [book.add_packets([SN, SN + 1], [b'x', b'y'])[0] for SN in range(0, 8, 2)]
+        self.assertEqual([page.to_bytes() for page in held], [b'xy'] * 4)
+        self.assertEqual((len(store), store.overflow_pages), (3, 1))
+        self.assertIsNot(held[-1].buffer, store.mmap)
+
+        for page in held:
+            book.release_page(page)
+        self.assertEqual(len(store), 2)  # The overflow page is dropped, the free list refilled
+
+    def test_overflow_page_not_reused(self):
+        # Test that an overflow page released first is dropped, not kept to buffer unpersisted window pages
+        store = SpillStore(self.path, num_slots=3, page_size=2, payload_size=128, mac_size=16)
+        book = SlidingBook(num_pages=2, page_size=2, timeout=60, page_factory=store)
+        held = [book.add_packets([SN, SN + 1], [b'x', b'y'])[0] for SN in range(0, 8, 2)]
+        self.assertFalse(store.owns(held[-1]))
+
+        for page in reversed(held):
+            book.release_page(page)
+        self.assertEqual(len(store), 2)
+        self.assertTrue(all(store.owns(page) for page in book.free_pages))
+
+    def test_layout_mismatch(self):
+        # Test that a file is not reopened with a different slot layout
+        SpillStore(self.path, num_slots=2, page_size=2, payload_size=128, mac_size=16).close()
+        with self.assertRaises(ValueError):
+            SpillStore(self.path, num_slots=2, page_size=4, payload_size=128, mac_size=16)
+
+if __name__ == '__main__':
+    unittest.main()
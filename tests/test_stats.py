@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from src import BookStats, ColumnarPage, Packet, SlidingBook
+
+class TestBookStats(unittest.TestCase):
+
+    def test_reorder_histogram(self):
+        # Test the log2 buckets of the reorder distance, per packet and vectorized
+        stats = BookStats()
+        for SN in [0, 1, 5, 4, 2, 6]:
+            stats.record_reorder(SN)
+        self.assertEqual(stats.reorder_distance[:4], [4, 1, 1, 0])  # 4 is 1 behind, 2 is 3 behind
+
+        vectorized = BookStats()
+        vectorized.record_reorders(np.array([0, 1, 5, 4, 2, 6]))
+        self.assertEqual(vectorized.reorder_distance, stats.reorder_distance)
+        self.assertEqual(vectorized.max_SN, 6)
+
+    def test_book_counters(self):
+        # Test that every way a packet can go is counted
+        events = []
+        now = [0.0]
+        book = SlidingBook(num_pages=2, page_size=2, timeout=1.0, clock=lambda: now[0],
+                           on_event=lambda event, value: events.append(event))
+        book.add_packet(Packet(SN=0, message=b'a'))
+        book.add_packet(Packet(SN=0, message=b'a'))  # Duplicate
+        now[0] = 0.5
+        book.add_packet(Packet(SN=1, message=b'b'))  # Completes page 0
+        book.add_packet(Packet(SN=1, message=b'b'))  # Below the window now
+        book.add_packet(Packet(SN=2, message=b'c'))
+        book.add_packet(Packet(SN=9, message=b'z'))  # Above the window
+        book.expire(2.0)  # Evicts page 1
+
+        stats = book.stats()
+        self.assertEqual(
+            {event: stats[event] for event in BookStats.EVENTS},
+            dict(accepted=3, duplicate=1, below_window=1, above_window=1, rejected=0, evicted_incomplete=1, completed_full=1))
+        self.assertEqual(events, ['accepted', 'duplicate', 'accepted', 'completed_full', 'below_window',
+                                  'accepted', 'above_window', 'evicted_incomplete'])
+        self.assertEqual(sum(stats['fill_time_us']), 2)
+        self.assertEqual(stats['fill_time_us'][(500000).bit_length()], 1)  # Page 0 took 0.5 s to fill
+        self.assertEqual(stats['global_min_SN'], 4)
+        self.assertEqual(stats['buffered_pages'], 0)
+
+    def test_batch_counters_match_loop(self):
+        # Test that add_packets counts the same events as add_packet in a loop
+        SNs = [0, 3, 3, 1, 2, 0, 30, 5, 4, 7, 6, 8]
+        packets = [Packet(SN=sn, message=b'x') for sn in SNs]
+        loop_book = SlidingBook(num_pages=2, page_size=3, timeout=60)
+        for packet in packets:
+            loop_book.add_packet(packet)
+        batch_book = SlidingBook(num_pages=2, page_size=3, timeout=60)
+        batch_book.add_packets(packets)
+
+        loop_stats = loop_book.stats()
+        batch_stats = batch_book.stats()
+        del loop_stats['fill_time_us'], batch_stats['fill_time_us']
+        self.assertEqual(batch_stats, loop_stats)
+
+    def test_rejected_packets(self):
+        # Test that packets a ColumnarPage cannot hold are counted as rejected instead of aborting the batch
+        factory = lambda page_size: ColumnarPage(page_size, payload_size=128, mac_size=16)
+        SNs = [2, 0, 1, 3, 4]
+        macs = [b'm', b'm', b'm' * 17, b'm', b'm']  # SN 1 has a MAC longer than mac_size
+        packets = [Packet(SN=SN, message=b'x', mac=mac) for SN, mac in zip(SNs, macs)]
+        packets[0] = Packet(SN=2, message=b'x' * 200)  # Longer than the payload size
+        loop_book = SlidingBook(num_pages=2, page_size=2, timeout=60, clock=lambda: 0.0, page_factory=factory)
+        for packet in packets:
+            loop_book.add_packet(packet)
+        batch_book = SlidingBook(num_pages=2, page_size=2, timeout=60, clock=lambda: 0.0, page_factory=factory)
+        pages = batch_book.add_packets(packets)
+
+        self.assertEqual(pages, [])
+        self.assertEqual(batch_book.stats(), loop_book.stats())
+        stats = batch_book.stats()
+        self.assertEqual((stats['accepted'], stats['rejected'], stats['above_window']), (2, 2, 1))
+        self.assertEqual(sorted(batch_book.pages), [0, 1])  # Page 1 was reopened by SN 3 after SN 2 was rejected
+
+if __name__ == '__main__':
+    unittest.main()
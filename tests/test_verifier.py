@@ -0,0 +1,60 @@
+import unittest
+import hmac
+from src import ColumnarPage, Packet, Page, PageVerifier
+
+KEY = b'secret'
+
+def signed_packet(SN, message, digestmod='sha384', tag_size=None):
+    mac = hmac.digest(KEY, message, digestmod)
+    return Packet(SN=SN, message=message, mac=mac[:tag_size] if tag_size else mac)
+
+class TestPageVerifier(unittest.TestCase):
+
+    def test_verify_page(self):
+        # Test that valid, forged and untagged packets are told apart
+        page = Page(page_size=4)
+        page.add_packet(signed_packet(0, b'message0'))
+        page.add_packet(signed_packet(1, b'message1', tag_size=16))  # Truncated tag
+        page.add_packet(Packet(SN=2, message=b'forged', mac=b'\0' * 48))
+        page.add_packet(Packet(SN=3, message=b'untagged'))
+
+        with PageVerifier(KEY) as verifier:
+            self.assertEqual(verifier.verify_page(page), 2)
+        self.assertEqual([p.verifing_bytes for p in page.packets], [48, 16, 0, 0])
+
+        # Shared placeholders of a lossy page are skipped, not written to
+        page = Page(page_size=3)
+        page.add_packet(signed_packet(1, b'message1'))
+        page.fill_missing_packets(shared=True)
+        with PageVerifier(KEY) as verifier:
+            self.assertEqual(verifier.verify_page(page), 1)
+        self.assertEqual(Page.MISSING.verifing_bytes, 0)
+
+    def test_verify_columnar_page(self):
+        # Test verification of a columnar page without materializing packets
+        page = ColumnarPage(page_size=2, payload_size=128)
+        page.add_packet(signed_packet(0, b'message0', digestmod='sha256'))
+        page.add_packet(Packet(SN=1, message=b'message1', mac=b'\1' * 32))
+
+        with PageVerifier(KEY, digestmod='sha256') as verifier:
+            self.assertEqual(verifier.verify_page(page), 1)
+        self.assertEqual(page.verifing_bytes.tolist(), [32, 0])
+        self.assertEqual(page.get_packet(0).verifing_bytes, 32)
+
+    def test_verify_pages(self):
+        # Test the batch entry point across several pages of full-size payloads
+        pages = []
+        for page_index in range(3):
+            page = Page(page_size=100)
+            for SN in range(page_index * 100, page_index * 100 + 100):
+                page.add_packet(signed_packet(SN, bytes([SN % 256]) * 1024))
+            pages.append(page)
+        pages[1].packets[5].mac = b'\0' * 48
+
+        with PageVerifier(KEY) as verifier:
+            self.assertEqual(verifier.verify_pages(pages), [100, 99, 100])
+        self.assertEqual(pages[1].packets[5].verifing_bytes, 0)
+        self.assertEqual(pages[2].packets[99].verifing_bytes, 48)
+
+if __name__ == '__main__':
+    unittest.main()